@@ -1,12 +1,15 @@
-import os
-import numpy as np
-from flask import Flask, render_template, request
-from joblib import load
-import pandas as pd
-import io
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
+import json
+import math
+import time
+from flask import Flask, Response, abort, g, jsonify, render_template, request, stream_with_context, url_for
+from charts import ChartCache, career_counts_png, confidence_png, contribution_png, feature_importance_png
+from dataset_service import DEFAULT_PAGE_SIZE, DatasetService
+from model_registry import get_registry
+from result_cache import get_result_cache
+from similar_profiles import DEFAULT_NEIGHBORS
+import result_cache
+import metrics
+from metrics import stage
 
 # --- App Initialization & Model Loading ---
 app = Flask(__name__)
@@ -29,16 +32,62 @@ CAREER_DESCRIPTIONS = {
 }
 
 # --- Load AI Models & Encoders ---
-def load_resources():
-    model = load(os.path.join('model', 'model.pkl'))
-    le_skills = load(os.path.join('model', 'skills_encoder.pkl'))
-    le_interest = load(os.path.join('model', 'interest_encoder.pkl'))
-    le_career = load(os.path.join('model', 'career_encoder.pkl'))
-    return model, le_skills, le_interest, le_career
+# The registry loads the active model version once per process and swaps in
+# newly trained versions in the background; each request works on one bundle.
+registry = get_registry()
+registry.current()
+# Repeated profiles are answered from the result cache, shared across workers
+# when CAREER_CACHE_URL is set.
+results = get_result_cache()
 
-model, le_skills, le_interest, le_career = load_resources()
-skills_list = sorted(le_skills.classes_)
-interests_list = sorted(le_interest.classes_)
+# --- Chart Cache ---
+# Charts derived from the model are versioned by the model version, so their
+# URLs can be cached by browsers until the model is retrained.
+FEATURE_LABELS = ['GPA', 'Skill', 'Interest']
+MODEL_CHARTS = {
+    'feature-importance': lambda bundle: feature_importance_png(FEATURE_LABELS, bundle.input_importances()),
+}
+CHART_MAX_AGE = 365 * 24 * 3600
+MAX_NEIGHBORS = 50
+chart_cache = ChartCache()
+dataset = DatasetService()
+
+def submitted_labels(values, field):
+    """The non-blank labels sent for a form or query field; an empty field arrives as [''] and counts as missing."""
+    labels = [value for value in values.getlist(field) if value.strip()]
+    if not labels:
+        raise ValueError(f"The {field} field is required.")
+    return labels
+
+def png_response(png, etag):
+    """Serves a cached chart with an ETag and a long-lived cache header."""
+    response = Response(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+# --- Instrumentation ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = metrics.start_profile()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or "unmatched"
+    metrics.REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    if g.profiler is not None:
+        metrics.finish_profile(g.profiler, endpoint)
+    return response
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target for this worker's counters and histograms."""
+    metrics.record_model(registry.current())
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # --- Flask Routes ---
 @app.route("/", methods=["GET", "POST"])
@@ -47,91 +96,209 @@ def index():
     error = None
     selected_values = {}
     plot_url = None
+    confidence_url = None
     description = None  # NEW: Variable for career description
+    similar = None
+
+    bundle = registry.current()
 
     if request.method == "POST":
         # ... (Your existing try/except block for getting form data and handling errors)
         try:
-            selected_values['gpa'] = request.form.get("gpa")
-            selected_values['interest'] = request.form.get("interest")
-            selected_values['skill'] = request.form.get("skill")
+            with stage('form_parse'):
+                selected_values['gpa'] = request.form.get("gpa")
+                if not selected_values['gpa']:
+                    raise ValueError("The gpa field is required.")
+                # Multi-hot models accept several skills and interests per profile.
+                selected_values['interest'] = submitted_labels(request.form, "interest")
+                selected_values['skill'] = submitted_labels(request.form, "skill")
 
-            if not selected_values['gpa'] or not selected_values['interest'] or not selected_values['skill']:
-                raise ValueError("All fields are required.")
-
-            gpa = float(selected_values['gpa'])
+                gpa = float(selected_values['gpa'])
+                if not math.isfinite(gpa):
+                    raise ValueError("GPA must be a number.")
 
             if gpa < 4.0:
                 error = "A GPA below 4.0 is too low for a meaningful recommendation."
             else:
-                skill_encoded = le_skills.transform([selected_values['skill']])[0]
-                interest_encoded = le_interest.transform([selected_values['interest']])[0]
-                features = np.array([[gpa, skill_encoded, interest_encoded]])
-                
-                pred_probabilities = model.predict_proba(features)[0]
-                top_3_indices = np.argsort(pred_probabilities)[-3:][::-1]
-                top_3_careers = le_career.inverse_transform(top_3_indices)
-                top_3_probs = pred_probabilities[top_3_indices]
-                
-                predictions = list(zip(top_3_careers, top_3_probs))
+                predictions = result_cache.recommend(results, bundle, gpa, selected_values['skill'], selected_values['interest'])
                 
                 # NEW: Get the description for the top career
                 top_career_name = predictions[0][0]
                 description = CAREER_DESCRIPTIONS.get(top_career_name, "No description available for this career.")
+                # Real training profiles closest to this one, as supporting evidence.
+                similar = bundle.similar(gpa, selected_values['skill'], selected_values['interest'])
                 
-                # --- Generate Feature Importance Plot ---
-                feature_importances = model.feature_importances_
-                importance_df = pd.DataFrame({
-                    'Feature': ['GPA', 'Skill', 'Interest'],
-                    'Importance': feature_importances
-                }).sort_values(by='Importance', ascending=True)
-
-                plt.style.use('dark_background')
-                fig, ax = plt.subplots(figsize=(8, 4))
-                ax.barh(importance_df['Feature'], importance_df['Importance'], color='#0ea5e9')
-                ax.set_title('Feature Importance')
-                ax.set_xlabel('Influence on Prediction')
-                
-                img = io.BytesIO()
-                plt.savefig(img, format='png', bbox_inches='tight', transparent=True)
-                img.seek(0)
-                plot_url = base64.b64encode(img.getvalue()).decode('utf8')
-                plt.close(fig)
+                # Charts are fetched by the browser from the cached chart routes. The
+                # explanation is specific to this profile; versions saved without
+                # node values fall back to the global feature importance.
+                if bundle.baseline is not None:
+                    plot_url = url_for("explanation_chart", v=bundle.version, **selected_values)
+                else:
+                    plot_url = url_for("model_chart", version=bundle.version, name="feature-importance")
+                confidence_url = url_for("confidence_chart", v=bundle.version, **selected_values)
 
         except ValueError as ve:
+            metrics.ERRORS.inc(endpoint="index", kind="invalid_input")
             error = f"Invalid input: {ve}"
         except Exception as e:
+            metrics.ERRORS.inc(endpoint="index", kind=type(e).__name__)
+            app.logger.exception("Recommendation failed")
             error = f"An unexpected error occurred: {e}"
 
+    with stage('template_render'):
+        return render_template(
+            "index.html",
+            predictions=predictions,
+            error=error,
+            skills=bundle.skills_list,
+            interests=bundle.interests_list,
+            selected=selected_values,
+            multi_select=bundle.multi_valued,
+            plot_url=plot_url,
+            confidence_url=confidence_url,
+            description=description, # NEW: Pass description to the template
+            similar=similar
+        )
+
+@app.route("/charts/<version>/<name>.png")
+def model_chart(version, name):
+    """Serves charts that depend only on the loaded model."""
+    bundle = registry.current()
+    if version != bundle.version or name not in MODEL_CHARTS:
+        abort(404)
+    png, etag = chart_cache.get((name, version), MODEL_CHARTS[name], bundle)
+    return png_response(png, etag)
+
+@app.route("/charts/confidence.png")
+def confidence_chart():
+    """Serves the top-3 confidence chart for one profile."""
+    bundle = registry.current()
+    try:
+        gpa = float(request.args.get("gpa", ""))
+        predictions = result_cache.recommend(results, bundle, gpa, submitted_labels(request.args, "skill"), submitted_labels(request.args, "interest"))
+    except ValueError:
+        abort(400)
+    careers = tuple(str(career) for career, _ in predictions)
+    probs = tuple(round(float(prob), 4) for _, prob in predictions)
+    png, etag = chart_cache.get(("confidence", careers, probs), confidence_png, careers, probs)
+    return png_response(png, etag)
+
+@app.route("/charts/explanation.png")
+def explanation_chart():
+    """Serves the per-input contributions behind one profile's top recommendation."""
+    bundle = registry.current()
+    try:
+        gpa = float(request.args.get("gpa", ""))
+        explanation = bundle.explain(gpa, submitted_labels(request.args, "skill"), submitted_labels(request.args, "interest"), k=1)
+    except ValueError:
+        abort(400)
+    if not explanation:
+        abort(404)
+    top = explanation[0]
+    values = tuple(round(top["contributions"][name], 4) for name in FEATURE_LABELS)
+    key = ("explanation", top["career"], round(top["baseline"], 4), values)
+    png, etag = chart_cache.get(key, contribution_png, top["career"], top["baseline"], tuple(FEATURE_LABELS), values)
+    return png_response(png, etag)
+
+@app.route("/api/explain")
+def explain():
+    """Splits the top recommendations for one profile into a baseline and per-input contributions."""
+    bundle = registry.current()
+    try:
+        gpa = float(request.args.get("gpa", ""))
+        explanation = bundle.explain(gpa, submitted_labels(request.args, "skill"), submitted_labels(request.args, "interest"))
+    except ValueError as ve:
+        return jsonify(error=f"Invalid input: {ve}"), 400
+    return jsonify(explanations=explanation)
+
+@app.route("/api/recommend/batch", methods=["POST"])
+def recommend_batch():
+    """Scores many profiles at once from a JSON list or CSV upload, streaming NDJSON results."""
+    # The batch path needs pandas; importing it here keeps it out of worker boot.
+    from batch import iter_csv_frames, iter_json_frames, score_frames
+    try:
+        if request.mimetype == "text/csv":
+            frames = iter_csv_frames(request.stream)
+        else:
+            payload = request.get_json(silent=True)
+            if payload is None:
+                raise ValueError("Send a JSON list of profiles or a text/csv body.")
+            frames = iter_json_frames(payload)
+        # Pull the first chunk now so malformed input is a 400, not a broken stream.
+        first = next(frames, None)
+    except ValueError as ve:
+        return jsonify(error=f"Invalid input: {ve}"), 400
+
+    bundle = registry.current()
+
+    def generate():
+        if first is None:
+            return
+        chunks = (frame for source in ([first], frames) for frame in source)
+        for result in score_frames(chunks, bundle):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/api/similar")
+def similar_profiles():
+    """Returns the training profiles closest to one profile ("students like you")."""
+    bundle = registry.current()
+    try:
+        gpa = float(request.args.get("gpa", ""))
+        k = min(int(request.args.get("k", DEFAULT_NEIGHBORS)), MAX_NEIGHBORS)
+        similar = bundle.similar(gpa, submitted_labels(request.args, "skill"), submitted_labels(request.args, "interest"), k)
+    except ValueError as ve:
+        return jsonify(error=f"Invalid input: {ve}"), 400
+    return jsonify(similar=similar)
+
+@app.route("/api/model")
+def model_info():
+    """Reports which model version this worker is serving and when it was loaded."""
+    return jsonify(registry.current().info())
+
+@app.route("/explorer")
+def explorer():
+    """Renders the explorer shell; the table is fetched page by page from /api/dataset/rows."""
+    snapshot = dataset.get()
+    plot_url = url_for("dataset_chart", fingerprint=snapshot.fingerprint, name="career-counts")
     return render_template(
-        "index.html",
-        predictions=predictions,
-        error=error,
-        skills=skills_list,
-        interests=interests_list,
-        selected=selected_values,
+        "explorer.html",
         plot_url=plot_url,
-        description=description # NEW: Pass description to the template
+        columns=snapshot.columns,
+        total=len(snapshot.df),
+        per_page=DEFAULT_PAGE_SIZE,
     )
 
-@app.route("/explorer")
-def explorer():
-    # ... (Your /explorer route remains the same)
-    df = pd.read_csv('dataset/career_data.csv')
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 8))
-    career_counts = df['Recommended_Career'].value_counts()
-    sns.barplot(x=career_counts.values, y=career_counts.index, ax=ax, palette='viridis')
-    ax.set_title('Number of Profiles per Career')
-    ax.set_xlabel('Count')
-    ax.set_ylabel('Career')
-    img = io.BytesIO()
-    plt.savefig(img, format='png', bbox_inches='tight', transparent=True)
-    img.seek(0)
-    plot_url = base64.b64encode(img.getvalue()).decode('utf8')
-    plt.close(fig)
-    table_html = df.to_html(classes='table table-dark table-striped table-hover', index=False, border=0)
-    return render_template("explorer.html", table=table_html, plot_url=plot_url)
+@app.route("/api/dataset/rows")
+def dataset_rows():
+    """Paginated, sortable and filterable view of the dataset.
+    Any query argument named after a column filters on that column's exact value."""
+    args = request.args
+    snapshot = dataset.get()
+    filters = {col: args[col] for col in snapshot.columns if col in args}
+    try:
+        result = snapshot.page(
+            page=args.get("page", 1),
+            per_page=args.get("per_page", DEFAULT_PAGE_SIZE),
+            sort=args.get("sort") or None,
+            descending=args.get("order") == "desc",
+            query=args.get("q"),
+            filters=filters,
+        )
+    except ValueError as ve:
+        return jsonify(error=f"Invalid input: {ve}"), 400
+    return jsonify(result)
+
+@app.route("/charts/dataset/<fingerprint>/<name>.png")
+def dataset_chart(fingerprint, name):
+    """Serves charts derived from the dataset, versioned by its content hash."""
+    snapshot = dataset.get()
+    if fingerprint != snapshot.fingerprint or name != "career-counts":
+        abort(404)
+    counts = snapshot.career_counts
+    png, etag = chart_cache.get((name, fingerprint), career_counts_png, tuple(counts.index), tuple(counts.values))
+    return png_response(png, etag)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
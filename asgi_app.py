@@ -0,0 +1,255 @@
+"""
+Asynchronous recommendation server with micro-batching.
+
+Concurrent requests to POST /api/recommend are queued and collected into
+micro-batches: the collector waits at most BATCH_WINDOW_MS after the first
+profile arrives, or until BATCH_MAX_SIZE profiles are waiting, then scores
+the whole batch with one vectorized model call on a worker thread and hands
+each caller its own top-3. While every worker is busy new requests keep
+queueing, so batches grow with load. The queue is bounded by QUEUE_DEPTH;
+once it is full new requests get a 503 with Retry-After instead of piling up.
+
+This is a plain ASGI application, run it with any ASGI server:
+
+    uvicorn asgi_app:app --port 8000
+
+Settings are read from the environment: CAREER_BATCH_WINDOW_MS,
+CAREER_BATCH_MAX_SIZE, CAREER_QUEUE_DEPTH and CAREER_BATCH_WORKERS.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from batch import score_frame
+from model_registry import get_registry
+import metrics
+
+BATCH_WINDOW_MS = float(os.environ.get('CAREER_BATCH_WINDOW_MS', '2'))
+BATCH_MAX_SIZE = int(os.environ.get('CAREER_BATCH_MAX_SIZE', '64'))
+QUEUE_DEPTH = int(os.environ.get('CAREER_QUEUE_DEPTH', '1024'))
+BATCH_WORKERS = int(os.environ.get('CAREER_BATCH_WORKERS', '1'))
+MAX_BODY_BYTES = 64 * 1024
+RETRY_AFTER_S = 1
+
+BATCH_SIZE = metrics.histogram(
+    'career_microbatch_size', 'Profiles scored per micro-batch.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+QUEUE_WAIT_SECONDS = metrics.histogram('career_microbatch_queue_seconds', 'Time a profile waited before its batch was scored.')
+QUEUE_SIZE = metrics.gauge('career_microbatch_queue_depth', 'Profiles waiting to be batched.')
+REJECTED = metrics.counter('career_microbatch_rejected_total', 'Requests turned away because the queue was full.')
+
+
+class Overloaded(Exception):
+    """Raised when the batching queue is full."""
+
+
+class MicroBatcher:
+    """Collects single-profile requests into batches scored on a thread pool."""
+
+    def __init__(self, registry, window_ms=BATCH_WINDOW_MS, max_size=BATCH_MAX_SIZE,
+                 queue_depth=QUEUE_DEPTH, workers=BATCH_WORKERS):
+        self.registry = registry
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.queue_depth = queue_depth
+        self.workers = workers
+        self._queue = None
+        self._collector = None
+        self._executor = None
+        self._slots = None
+
+    def start(self):
+        """Starts the collector on the running event loop; called at startup or on first use."""
+        if self._collector is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_depth)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='microbatch')
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._collector = None
+
+    async def submit(self, profile):
+        """Queues one profile dict and returns its scored result dict."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((profile, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            REJECTED.inc()
+            raise Overloaded()
+        QUEUE_SIZE.set(self._queue.qsize())
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Only start a batch when a worker is free, so load builds up bigger batches.
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self.max_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            QUEUE_SIZE.set(self._queue.qsize())
+            task = loop.run_in_executor(self._executor, self._score, batch)
+            task.add_done_callback(lambda task, batch=batch: self._deliver(task, batch))
+
+    def _score(self, batch):
+        now = time.perf_counter()
+        for _, _, queued_at in batch:
+            QUEUE_WAIT_SECONDS.observe(now - queued_at)
+        BATCH_SIZE.observe(len(batch))
+        frame = pd.DataFrame.from_records([profile for profile, _, _ in batch], columns=['gpa', 'skill', 'interest'])
+        return score_frame(frame, self.registry.current())
+
+    def _deliver(self, task, batch):
+        self._slots.release()
+        error = task.exception()
+        results = task.result() if error is None else None
+        for i, (_, future, _) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+
+registry = get_registry()
+registry.current()
+batcher = MicroBatcher(registry)
+
+
+# --- ASGI Plumbing ---
+async def read_body(receive, limit=MAX_BODY_BYTES):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > limit:
+            raise ValueError("Request body is too large.")
+        if not message.get('more_body', False):
+            return body
+
+
+async def send_response(send, status, body, content_type='application/json', headers=()):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def parse_profile(body):
+    """Validates the JSON body of a recommendation request into a profile dict."""
+    try:
+        payload = json.loads(body or b'null')
+    except json.JSONDecodeError:
+        raise ValueError("Body must be JSON.")
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object with gpa, skill and interest.")
+    profile = {field: payload.get(field) for field in ('gpa', 'skill', 'interest')}
+    if any(value in (None, '') for value in profile.values()):
+        raise ValueError("All fields are required.")
+    return profile
+
+
+# --- Routes ---
+async def recommend(scope, receive, send):
+    """Scores one profile as part of the next micro-batch."""
+    try:
+        profile = parse_profile(await read_body(receive))
+    except ValueError as ve:
+        metrics.ERRORS.inc(endpoint='recommend', kind='invalid_input')
+        return await send_response(send, 400, {'error': f"Invalid input: {ve}"})
+    try:
+        result = await batcher.submit(profile)
+    except Overloaded:
+        return await send_response(send, 503, {'error': "Server is busy, retry shortly."},
+                                   headers=[(b'retry-after', str(RETRY_AFTER_S).encode())])
+    if 'error' in result:
+        metrics.ERRORS.inc(endpoint='recommend', kind='invalid_input')
+        return await send_response(send, 400, {'error': f"Invalid input: {result['error']}"})
+    return await send_response(send, 200, {'recommendations': result['recommendations']})
+
+
+async def model_info(scope, receive, send):
+    """Reports which model version this worker is serving and when it was loaded."""
+    return await send_response(send, 200, registry.current().info())
+
+
+async def metrics_endpoint(scope, receive, send):
+    """Prometheus scrape target for this worker's counters and histograms."""
+    metrics.record_model(registry.current())
+    return await send_response(send, 200, metrics.render().encode(), 'text/plain; version=0.0.4')
+
+
+ROUTES = {
+    ('POST', '/api/recommend'): recommend,
+    ('GET', '/api/model'): model_info,
+    ('GET', '/metrics'): metrics_endpoint,
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            batcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    start = time.perf_counter()
+    handler = ROUTES.get((scope['method'], scope['path']))
+    endpoint = handler.__name__ if handler else 'unmatched'
+    status = {}
+
+    async def tracking_send(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        await send(message)
+
+    if handler is None:
+        await send_response(tracking_send, 404, {'error': "Not found."})
+    else:
+        await handler(scope, receive, tracking_send)
+    metrics.REQUESTS.inc(endpoint=endpoint, method=scope['method'], status=str(status.get('code', 500)))
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, port=8000)
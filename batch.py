@@ -0,0 +1,154 @@
+"""
+Vectorized batch scoring of student profiles.
+
+Profiles arrive as JSON or CSV, are encoded a whole chunk at a time and
+scored with one model call per chunk. For multi-hot models a skill or
+interest field may list several labels, as a JSON list or a delimited string. Rows with an unknown skill or interest
+or an unusable GPA are reported individually instead of failing the batch.
+"""
+import io
+import numpy as np
+import pandas as pd
+from lattice import top_k
+from metrics import PREDICTIONS, stage
+
+BATCH_CHUNK_SIZE = 4096
+MIN_GPA = 4.0
+REQUIRED_COLUMNS = ['gpa', 'skill', 'interest']
+# Accept the dataset's own column names as well as the form field names.
+COLUMN_ALIASES = {'skills': 'skill', 'interests': 'interest'}
+
+
+def unwrap_label(value):
+    """A one-element list is its element, as for single profiles."""
+    return value[0] if isinstance(value, (list, tuple)) and len(value) == 1 else value
+
+
+def normalize_labels(values):
+    """Applies the same cleaning as train_model.py: trimmed and title-cased."""
+    values = pd.Series(values, dtype=object).map(unwrap_label)
+    return values.where(values.notna(), '').astype(str).str.strip().str.title()
+
+
+def missing_values(values):
+    """True where a field is absent: None, NaN, an empty or blank string or an empty list."""
+    return np.array([
+        value is None or (isinstance(value, float) and np.isnan(value))
+        or (isinstance(value, str) and not value.strip()) or (isinstance(value, (list, tuple)) and not value)
+        for value in values
+    ], dtype=bool)
+
+
+def encode_labels(encoder, values):
+    """
+    Vectorized LabelEncoder.transform that flags unknown labels instead of raising.
+    Returns (codes, known) where codes are only meaningful where known is True.
+    """
+    # get_indexer works for any class order; incrementally updated vocabularies
+    # append new labels instead of keeping them sorted.
+    codes = pd.Index(encoder.classes_).get_indexer(normalize_labels(values))
+    known = codes >= 0
+    return np.maximum(codes, 0), known
+
+
+def prepare_frame(frame):
+    """Normalizes column names and checks that every required field is present."""
+    frame = frame.rename(columns=lambda c: COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}.")
+    return frame
+
+
+def iter_json_frames(payload, chunk_size=BATCH_CHUNK_SIZE):
+    """Splits a JSON list of profiles (or {"profiles": [...]}) into DataFrame chunks."""
+    if isinstance(payload, dict):
+        payload = payload.get('profiles')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of profiles or an object with a 'profiles' list.")
+    if not all(isinstance(row, dict) for row in payload):
+        raise ValueError("Every profile must be a JSON object.")
+    for start in range(0, len(payload), chunk_size):
+        yield prepare_frame(pd.DataFrame.from_records(payload[start:start + chunk_size]))
+
+
+def iter_csv_frames(stream, chunk_size=BATCH_CHUNK_SIZE):
+    """Reads a CSV stream in chunks so large uploads are never held in memory at once."""
+    if isinstance(stream, (bytes, str)):
+        stream = io.BytesIO(stream.encode() if isinstance(stream, str) else stream)
+    try:
+        reader = pd.read_csv(stream, chunksize=chunk_size, dtype=str, keep_default_na=False)
+        for frame in reader:
+            yield prepare_frame(frame)
+    except pd.errors.EmptyDataError:
+        return
+
+
+def score_frame(frame, bundle, k=3, offset=0):
+    """Scores one chunk of profiles with a ModelBundle and returns a result dict per row, in input order."""
+    n_rows = len(frame)
+    skills, interests = frame['skill'].tolist(), frame['interest'].tolist()
+    with stage('batch_encode'):
+        gpa = pd.to_numeric(frame['gpa'], errors='coerce').to_numpy(dtype=np.float64)
+        if bundle.encoder is not None:
+            features, label_errors = bundle.encoder.transform(np.nan_to_num(gpa), skills, interests)
+            errors = np.empty(n_rows, dtype=object)
+            errors[:] = label_errors
+        else:
+            skill_codes, skill_known = encode_labels(bundle.le_skills, frame['skill'])
+            interest_codes, interest_known = encode_labels(bundle.le_interest, frame['interest'])
+            errors = np.full(n_rows, None, dtype=object)
+            errors[~interest_known] = "Unknown interest '{interest}'."
+            errors[~skill_known] = "Unknown skill '{skill}'."
+            for i in np.flatnonzero(~(skill_known & interest_known)):
+                errors[i] = errors[i].format(skill=unwrap_label(skills[i]), interest=unwrap_label(interests[i]))
+    errors[gpa < MIN_GPA] = f"A GPA below {MIN_GPA} is too low for a meaningful recommendation."
+    errors[~np.isfinite(gpa)] = 'GPA must be a number.'
+    # An empty field is reported as missing, not as an unknown label 'nan'.
+    for field, values in (('gpa', frame['gpa'].tolist()), ('skill', skills), ('interest', interests)):
+        errors[missing_values(values)] = f"The {field} field is required."
+    valid = np.equal(errors, None)
+
+    if valid.any():
+        if bundle.lattice is not None and k <= bundle.lattice.k:
+            with stage('batch_lattice_lookup'):
+                indices, probs = bundle.lattice.lookup(gpa[valid], skill_codes[valid], interest_codes[valid])
+            PREDICTIONS.inc(int(valid.sum()), path='lattice')
+        else:
+            if bundle.encoder is not None:
+                features = features[np.flatnonzero(valid)]
+            else:
+                features = np.column_stack([gpa[valid], skill_codes[valid], interest_codes[valid]])
+            with stage('batch_predict_proba'):
+                proba = bundle.predict_proba(features)
+            with stage('batch_top_k'):
+                indices, probs = top_k(proba, k)
+            PREDICTIONS.inc(int(valid.sum()), path='forest')
+        careers = bundle.le_career.classes_[indices[:, :k]]
+        probs = probs[:, :k]
+
+    ids = frame['id'].astype(object).where(frame['id'].notna(), None).tolist() if 'id' in frame.columns else None
+    results = []
+    scored = 0
+    for i in range(n_rows):
+        result = {'row': offset + i}
+        if ids is not None:
+            result['id'] = ids[i]
+        if valid[i]:
+            result['recommendations'] = [
+                {'career': str(career), 'probability': round(float(prob), 6)}
+                for career, prob in zip(careers[scored], probs[scored])
+            ]
+            scored += 1
+        else:
+            result['error'] = errors[i]
+        results.append(result)
+    return results
+
+
+def score_frames(frames, bundle, k=3):
+    """Scores a stream of DataFrame chunks, yielding per-row results as they are ready."""
+    offset = 0
+    for frame in frames:
+        yield from score_frame(frame, bundle, k, offset)
+        offset += len(frame)
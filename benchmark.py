@@ -0,0 +1,363 @@
+"""
+Local latency and throughput benchmarks for the recommendation paths.
+
+Measures cold start, the import time of every entry point, the stages of a single recommendation through the
+Flask app, batch throughput of the model at several batch sizes, and the
+explorer routes as the dataset grows. Results are written as JSON with
+p50/p95/p99 per metric (milliseconds), and a saved run can be used as a
+baseline to flag regressions:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json --threshold 0.2
+
+The imports suite runs each entry point under python -X importtime and fails
+the run when one exceeds its budget in IMPORT_BUDGETS_MS.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+SAMPLE_PROFILE = {'gpa': '8.37', 'skill': 'Python', 'interest': 'Ai'}
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+EXPLORER_SIZES = [1000, 10000, 100000]
+# Cumulative import time allowed per entry point. Only the paths that need
+# pandas (the ASGI app, bulk scoring) pay for it at import.
+IMPORT_BUDGETS_MS = {
+    'app': 800,
+    'asgi_app': 1500,
+    'bulk_scoring': 1500,
+    'model_registry': 400,
+    'predict_career': 100,
+    'train_model': 600,
+}
+IMPORT_OFFENDERS = 5
+
+
+def summarize(samples_ms, **extra):
+    """Reduces raw timings (ms) to the percentiles stored in the report."""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    summary = {
+        'n': int(samples.size),
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+    }
+    summary.update(extra)
+    return summary
+
+
+def timeit(fn, repeats, warmup=1):
+    """Runs fn repeatedly and returns each call's duration in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_cold_start(repeats):
+    """Fresh interpreters timing imports plus model loading, as a worker or CLI start would."""
+    snippets = {
+        'cold_start.app': 'import app',
+        'cold_start.predict_career': 'import predict_career; predict_career.load_resources()',
+        'cold_start.registry': 'from model_registry import get_registry; get_registry().current()',
+    }
+    results = {}
+    for name, snippet in snippets.items():
+        code = (
+            'import time, warnings; warnings.simplefilter("ignore"); t = time.perf_counter(); '
+            f'{snippet}; print((time.perf_counter() - t) * 1000)'
+        )
+        samples = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+            samples.append(float(out.stdout.strip().splitlines()[-1]))
+        results[name] = summarize(samples)
+    return results
+
+
+def parse_importtime(stderr):
+    """Parses -X importtime output into {module: cumulative ms}, keeping top-level packages only."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if cumulative.strip().isdigit() and '.' not in name:
+            times[name] = max(times.get(name, 0.0), int(cumulative) / 1000)
+    return times
+
+
+def bench_imports(repeats):
+    """Cumulative import time of each entry point in a fresh interpreter, with its heaviest imports."""
+    results = {}
+    for module in sorted(IMPORT_BUDGETS_MS):
+        code = f'import warnings; warnings.simplefilter("ignore"); import {module}'
+        samples, offenders = [], {}
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+            times = parse_importtime(out.stderr)
+            samples.append(times[module])
+            for name, ms in times.items():
+                offenders[name] = offenders.get(name, 0.0) + ms / repeats
+        del offenders[module]
+        top = sorted(offenders.items(), key=lambda item: -item[1])[:IMPORT_OFFENDERS]
+        results[f'import.{module}'] = summarize(samples, budget_ms=IMPORT_BUDGETS_MS[module], top=[[n, round(ms, 1)] for n, ms in top])
+    return results
+
+
+def over_budget(results):
+    """Returns (metric, p50, budget) for every import that exceeds its budget."""
+    return [
+        (name, summary['p50'], summary['budget_ms'])
+        for name, summary in sorted(results.items())
+        if 'budget_ms' in summary and summary['p50'] > summary['budget_ms']
+    ]
+
+
+def bench_single_request(repeats):
+    """Stage-by-stage cost of one recommendation, then the full request through the test client."""
+    import app
+    from charts import confidence_png
+    from lattice import top_k
+
+    bundle = app.registry.current()
+    gpa = float(SAMPLE_PROFILE['gpa'])
+    skill_encoded = bundle.le_skills.transform([SAMPLE_PROFILE['skill']])[0]
+    interest_encoded = bundle.le_interest.transform([SAMPLE_PROFILE['interest']])[0]
+    features = np.array([[gpa, skill_encoded, interest_encoded]])
+    proba = bundle.model.predict_proba(features)
+    predictions = bundle.recommend(gpa, SAMPLE_PROFILE['skill'], SAMPLE_PROFILE['interest'])
+    careers = tuple(str(c) for c, _ in predictions)
+    probs = tuple(float(p) for _, p in predictions)
+    client = app.app.test_client()
+
+    results = {
+        'request.encode': summarize(timeit(lambda: (
+            bundle.le_skills.transform([SAMPLE_PROFILE['skill']]),
+            bundle.le_interest.transform([SAMPLE_PROFILE['interest']]),
+        ), repeats)),
+        'request.predict': summarize(timeit(lambda: bundle.model.predict_proba(features), repeats)),
+        'request.top3': summarize(timeit(lambda: top_k(proba, 3), repeats)),
+        'request.plot': summarize(timeit(lambda: confidence_png(careers, probs), max(3, repeats // 10))),
+        'request.index_post': summarize(timeit(lambda: client.post('/', data=SAMPLE_PROFILE), repeats)),
+    }
+    if bundle.lattice is not None:
+        results['request.lattice_lookup'] = summarize(
+            timeit(lambda: bundle.lattice.lookup(gpa, skill_encoded, interest_encoded), repeats)
+        )
+    if bundle.baseline is not None:
+        results['request.explain'] = summarize(timeit(
+            lambda: bundle.explain(gpa, SAMPLE_PROFILE['skill'], SAMPLE_PROFILE['interest']), repeats
+        ))
+    if bundle.profiles is not None:
+        results['request.similar'] = summarize(timeit(
+            lambda: bundle.similar(gpa, SAMPLE_PROFILE['skill'], SAMPLE_PROFILE['interest']), repeats
+        ))
+    return results
+
+
+def bench_batch(repeats):
+    """
+    predict_proba throughput at growing batch sizes for each available model path:
+    the flat forest's NumPy engine, the pickled forest and the bundle, which hands
+    batches of SKLEARN_MIN_ROWS or more to the pickled forest.
+
+    p50 in ms on one core, for 100-tree forests trained on the bundled dataset:
+
+                 dense rows                 multi-hot CSR rows
+        rows     flat   sklearn  bundle     flat   sklearn  bundle
+        1        0.57     4.4     0.60      0.83     5.0     0.83
+        100      2.5      5.4     2.5       2.8      4.6     2.8
+        1000    17.8     10.1    10.1      20.6     10.1    11.3
+        10000  204       75.7    69.4     224       67.6    75.4
+    """
+    from model_registry import get_registry
+    from forest_artifact import probe_profiles
+    from multi_hot import probe_matrix
+
+    bundle = get_registry().current()
+    models = {'model': bundle.model, 'bundle': bundle}
+    pickle_path = os.path.join(bundle.path, 'model.pkl')
+    if os.path.exists(pickle_path) and type(bundle.model).__name__ != 'RandomForestClassifier':
+        from joblib import load
+        models['sklearn'] = load(pickle_path)
+
+    results = {}
+    if bundle.encoder is not None:
+        profiles = probe_matrix(bundle.encoder, max(BATCH_SIZES))
+    else:
+        profiles = probe_profiles(len(bundle.le_skills.classes_), len(bundle.le_interest.classes_), max(BATCH_SIZES))
+    for size in BATCH_SIZES:
+        X = profiles[:size]
+        runs = max(3, repeats // max(1, size // 100))
+        for name, model in models.items():
+            samples = timeit(lambda: model.predict_proba(X), runs)
+            results[f'batch.{name}.{size}'] = summarize(samples, rows_per_s=size / (np.median(samples) / 1000))
+        if bundle.lattice is not None:
+            samples = timeit(lambda: bundle.lattice.lookup(X[:, 0], X[:, 1].astype(int), X[:, 2].astype(int)), runs)
+            results[f'batch.lattice.{size}'] = summarize(samples, rows_per_s=size / (np.median(samples) / 1000))
+    return results
+
+
+def bench_explorer(repeats):
+    """Explorer page and first table page on synthetic datasets of growing size."""
+    import pandas as pd
+    import app
+    from dataset_service import DatasetService
+
+    base = pd.read_csv(os.path.join('dataset', 'career_data.csv'))
+    client = app.app.test_client()
+    original = app.dataset
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in EXPLORER_SIZES:
+                path = os.path.join(tmp, f'career_data_{size}.csv')
+                base.sample(size, replace=True, random_state=0).to_csv(path, index=False)
+                app.dataset = DatasetService(path)
+                start = time.perf_counter()
+                client.get('/explorer')
+                results[f'explorer.first_load.{size}'] = summarize([(time.perf_counter() - start) * 1000])
+                results[f'explorer.page.{size}'] = summarize(timeit(lambda: client.get('/explorer'), repeats))
+                results[f'explorer.rows.{size}'] = summarize(
+                    timeit(lambda: client.get('/api/dataset/rows?sort=GPA&order=desc'), repeats)
+                )
+    finally:
+        app.dataset = original
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns rows of (metric, baseline p50, current p50, change, regressed)."""
+    rows = []
+    for name, current in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['p50'], current['p50']
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > threshold))
+    return rows
+
+
+def print_results(results):
+    table = Table(show_header=True, header_style="bold magenta", title="Benchmark Results (ms)")
+    table.add_column("Metric", style="cyan")
+    for column in ["n", "p50", "p95", "p99", "rows/s"]:
+        table.add_column(column, justify="right")
+    for name, summary in sorted(results.items()):
+        rows_per_s = f"{summary['rows_per_s']:,.0f}" if 'rows_per_s' in summary else ""
+        table.add_row(name, str(summary['n']), f"{summary['p50']:.3f}", f"{summary['p95']:.3f}", f"{summary['p99']:.3f}", rows_per_s)
+    console.print(table)
+
+
+def print_imports(results):
+    if not any('budget_ms' in summary for summary in results.values()):
+        return
+    table = Table(show_header=True, header_style="bold magenta", title="Import Time (ms, p50)")
+    table.add_column("Entry Point", style="cyan")
+    for column in ["p50", "Budget", "Heaviest Imports"]:
+        table.add_column(column, justify="right" if column != "Heaviest Imports" else "left")
+    for name, summary in sorted(results.items()):
+        if 'budget_ms' not in summary:
+            continue
+        style = "bold red" if summary['p50'] > summary['budget_ms'] else "green"
+        heaviest = ", ".join(f"{n} {ms:.0f}" for n, ms in summary['top'])
+        table.add_row(name, f"[{style}]{summary['p50']:.1f}[/{style}]", f"{summary['budget_ms']:.0f}", heaviest)
+    console.print(table)
+
+
+def print_comparison(rows, threshold):
+    table = Table(show_header=True, header_style="bold magenta", title=f"Comparison with Baseline (p50, threshold {threshold:.0%})")
+    table.add_column("Metric", style="cyan")
+    for column in ["Baseline", "Current", "Change"]:
+        table.add_column(column, justify="right")
+    for name, before, after, change, regressed in rows:
+        style = "bold red" if regressed else "green" if change < -threshold else ""
+        table.add_row(name, f"{before:.3f}", f"{after:.3f}", f"[{style}]{change:+.1%}[/{style}]" if style else f"{change:+.1%}")
+    console.print(table)
+
+
+SUITES = {
+    'cold_start': bench_cold_start,
+    'imports': bench_imports,
+    'request': bench_single_request,
+    'batch': bench_batch,
+    'explorer': bench_explorer,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the career recommender.")
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="run only these suites (repeatable)")
+    parser.add_argument("--repeats", type=int, default=200, help="timed calls per metric (default: 200)")
+    parser.add_argument("--cold-repeats", type=int, default=5, help="fresh interpreters per cold-start and import metric (default: 5)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative p50 slowdown that counts as a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    results = {}
+    for name in args.suite or list(SUITES):
+        console.print(f"[yellow]Running {name} benchmarks...[/yellow]")
+        repeats = args.cold_repeats if name in ('cold_start', 'imports') else args.repeats
+        results.update(SUITES[name](repeats))
+
+    from model_registry import get_registry
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'model_version': get_registry().current().version,
+        },
+        'results': results,
+    }
+    print_results(results)
+    print_imports(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        console.print(f"✅ Report written to '{args.output}'.")
+
+    status = 0
+    slow_imports = over_budget(results)
+    if slow_imports:
+        console.print("[bold red]Over import budget: " + ", ".join(
+            f"{name} {p50:.0f} ms > {budget:.0f} ms" for name, p50, budget in slow_imports
+        ) + "[/bold red]")
+        status = 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            console.print(f"[bold red]{len(regressions)} regression(s): {', '.join(regressions)}[/bold red]")
+            return 1
+        console.print("[bold green]No regressions.[/bold green]")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
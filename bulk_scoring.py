@@ -0,0 +1,170 @@
+"""
+Headless bulk scoring for nightly batch jobs.
+
+Profiles are read from stdin, a CSV, a JSON Lines or a Parquet file one
+chunk at a time, scored with the vectorized batch path and written out as
+CSV or JSON Lines as soon as each chunk is done, so memory use depends on
+the chunk size and not on the size of the input. Every job pins the model
+version that is active when it starts, so a retrain half way through never
+mixes versions in one output.
+
+Inputs larger than one chunk are spread over a process pool. At most two
+chunks per worker are in flight and results are written in input order, so
+the pool never buffers more than a few chunks however large the input is.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from batch import iter_csv_frames, prepare_frame, score_frame
+from model_registry import MODEL_DIR, ModelBundle, active_version_dir
+
+BULK_CHUNK_SIZE = 50_000
+IN_FLIGHT_PER_WORKER = 2
+INPUT_FORMATS = ['csv', 'jsonl', 'parquet']
+OUTPUT_FORMATS = ['csv', 'jsonl']
+
+
+def infer_format(path, default='csv'):
+    """Guesses a file format from its extension; stdin ('-') uses the default."""
+    if path in (None, '-'):
+        return default
+    if path.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_input_frames(path, fmt, chunk_size=BULK_CHUNK_SIZE):
+    """Yields DataFrame chunks of profiles from a path or stdin ('-')."""
+    if fmt == 'parquet':
+        if path == '-':
+            raise ValueError("Parquet input must be a file, not stdin.")
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield prepare_frame(batch.to_pandas())
+        return
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        if fmt == 'jsonl':
+            for frame in pd.read_json(stream, lines=True, chunksize=chunk_size, dtype=False):
+                yield prepare_frame(frame)
+        else:
+            yield from iter_csv_frames(stream, chunk_size)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def csv_header(k, with_id):
+    header = ['row'] + (['id'] if with_id else [])
+    for rank in range(1, k + 1):
+        header += [f'career_{rank}', f'probability_{rank}']
+    return header + ['error']
+
+
+def format_results(results, fmt, k, with_id):
+    """Serializes one chunk of score_frame results as CSV rows (no header) or JSON Lines."""
+    if fmt == 'jsonl':
+        return ''.join(json.dumps(result) + '\n' for result in results)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for result in results:
+        row = [result['row']] + ([result.get('id')] if with_id else [])
+        recommendations = result.get('recommendations', [])
+        for rank in range(k):
+            if rank < len(recommendations):
+                row += [recommendations[rank]['career'], recommendations[rank]['probability']]
+            else:
+                row += ['', '']
+        writer.writerow(row + [result.get('error', '')])
+    return out.getvalue()
+
+
+def _summarize(results):
+    return len(results), sum('error' in result for result in results)
+
+
+# --- Worker Processes ---
+_worker_bundle = None
+
+
+def _init_worker(version, path):
+    global _worker_bundle
+    _worker_bundle = ModelBundle(version, path)
+
+
+def _score_chunk(frame, k, offset, fmt, with_id):
+    results = score_frame(frame, _worker_bundle, k, offset)
+    return format_results(results, fmt, k, with_id), _summarize(results)
+
+
+def _score_serial(frames, bundle, k, fmt, with_id):
+    offset = 0
+    for frame in frames:
+        results = score_frame(frame, bundle, k, offset)
+        offset += len(frame)
+        yield format_results(results, fmt, k, with_id), _summarize(results)
+
+
+def _score_parallel(frames, version, path, k, fmt, with_id, jobs):
+    pending = deque()
+    offset = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(version, path)) as pool:
+        for frame in frames:
+            pending.append(pool.submit(_score_chunk, frame, k, offset, fmt, with_id))
+            offset += len(frame)
+            if len(pending) >= jobs * IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(input_path, output, k=3, input_format=None, output_format=None,
+               chunk_size=BULK_CHUNK_SIZE, jobs=None, model_dir=MODEL_DIR):
+    """
+    Scores every profile of input_path and writes the results to the text stream output.
+    Returns a summary dict with the model version, row and error counts and timing.
+    """
+    start = time.perf_counter()
+    input_format = input_format or infer_format(input_path)
+    output_format = output_format or 'csv'
+    jobs = jobs or os.cpu_count() or 1
+    version, path = active_version_dir(model_dir)
+
+    frames = iter_input_frames(input_path, input_format, chunk_size)
+    first = next(frames, None)
+    if first is None:
+        return {'version': version, 'rows': 0, 'errors': 0, 'workers': 0, 'seconds': time.perf_counter() - start}
+    second = next(frames, None)
+    with_id = 'id' in first.columns
+    if output_format == 'csv':
+        output.write(','.join(csv_header(k, with_id)) + '\n')
+
+    chunks = (frame for source in ([first], [second] if second is not None else [], frames) for frame in source)
+    # A single chunk is scored in-process; starting workers would cost more than it saves.
+    workers = jobs if second is not None and jobs > 1 else 1
+    if workers > 1:
+        scored = _score_parallel(chunks, version, path, k, output_format, with_id, workers)
+    else:
+        scored = _score_serial(chunks, ModelBundle(version, path), k, output_format, with_id)
+
+    rows = errors = 0
+    for text, (n_rows, n_errors) in scored:
+        output.write(text)
+        rows += n_rows
+        errors += n_errors
+    output.flush()
+    return {
+        'version': version,
+        'rows': rows,
+        'errors': errors,
+        'workers': workers,
+        'seconds': time.perf_counter() - start,
+    }
@@ -0,0 +1,147 @@
+"""
+Chart rendering and caching for the Flask app.
+
+Charts are drawn with matplotlib's object-oriented Agg canvas instead of
+pyplot, so no global figure state is shared between threads, and rendering
+happens on a small worker pool rather than on the request thread. matplotlib
+is only imported when the first chart is drawn. Finished
+PNGs are cached by a key that includes a fingerprint of whatever they were
+drawn from, such as the model version.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from metrics import record_cache, stage
+
+CHART_COLOR = '#0ea5e9'
+NEGATIVE_COLOR = '#f87171'
+TEXT_COLOR = 'white'
+RENDER_WORKERS = 2
+CACHE_SIZE = 256
+
+
+def _style_axes(ax):
+    """Applies the dark-background look without touching pyplot's global rcParams."""
+    ax.set_facecolor('none')
+    ax.tick_params(colors=TEXT_COLOR)
+    for spine in ax.spines.values():
+        spine.set_color(TEXT_COLOR)
+    ax.title.set_color(TEXT_COLOR)
+    ax.xaxis.label.set_color(TEXT_COLOR)
+    ax.yaxis.label.set_color(TEXT_COLOR)
+
+
+def render_png(draw, figsize=(8, 4)):
+    """Draws onto a fresh Figure via draw(fig, ax) and returns the PNG bytes."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    draw(fig, ax)
+    _style_axes(ax)
+    img = io.BytesIO()
+    fig.savefig(img, format='png', bbox_inches='tight', transparent=True)
+    return img.getvalue()
+
+
+def feature_importance_png(feature_names, importances):
+    """Horizontal bar chart of the model's global feature importances."""
+    ranked = sorted(zip(importances, feature_names))
+
+    def draw(fig, ax):
+        ax.barh([name for _, name in ranked], [value for value, _ in ranked], color=CHART_COLOR)
+        ax.set_title('Feature Importance')
+        ax.set_xlabel('Influence on Prediction')
+
+    return render_png(draw)
+
+
+def confidence_png(careers, probabilities):
+    """Horizontal bar chart of one profile's top recommendations."""
+
+    def draw(fig, ax):
+        ax.barh(list(careers)[::-1], [p * 100 for p in probabilities][::-1], color=CHART_COLOR)
+        ax.set_title('Confidence per Recommendation')
+        ax.set_xlabel('Confidence (%)')
+        ax.set_xlim(0, 100)
+
+    return render_png(draw, figsize=(8, 3))
+
+
+def contribution_png(career, baseline, inputs, contributions):
+    """Bar chart of how much each input moved one profile's top career away from the baseline."""
+    colors = [CHART_COLOR if value >= 0 else NEGATIVE_COLOR for value in contributions]
+
+    def draw(fig, ax):
+        ax.barh(list(inputs)[::-1], [value * 100 for value in contributions][::-1], color=colors[::-1])
+        ax.axvline(0, color=TEXT_COLOR, linewidth=0.8)
+        ax.set_title(f'Why {career}? (baseline {baseline:.0%})')
+        ax.set_xlabel('Change in Confidence (percentage points)')
+
+    return render_png(draw, figsize=(8, 3))
+
+
+def _timed_render(render, *args):
+    with stage('chart_render'):
+        return render(*args)
+
+
+def career_counts_png(careers, counts):
+    """Horizontal bar chart of how many profiles each career has, largest first."""
+    from matplotlib import colormaps
+    colors = colormaps['viridis'](
+        [i / max(len(careers) - 1, 1) for i in range(len(careers))]
+    )
+
+    def draw(fig, ax):
+        ax.barh(list(careers)[::-1], list(counts)[::-1], color=colors[::-1])
+        ax.set_title('Number of Profiles per Career')
+        ax.set_xlabel('Count')
+        ax.set_ylabel('Career')
+
+    return render_png(draw, figsize=(10, 8))
+
+
+class ChartCache:
+    """
+    Bounded, thread-safe LRU of rendered PNGs.
+    Concurrent requests for the same chart share one render on the worker pool.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, workers=RENDER_WORKERS):
+        self.maxsize = maxsize
+        self._charts = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart-render')
+
+    def get(self, key, render, *args):
+        """Returns (png_bytes, etag) for key, rendering it with render(*args) on a miss."""
+        with self._lock:
+            if key in self._charts:
+                self._charts.move_to_end(key)
+                record_cache('chart', hit=True)
+                return self._charts[key]
+            record_cache('chart', hit=False)
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(_timed_render, render, *args)
+                self._pending[key] = future
+        try:
+            png = future.result()
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        entry = (png, hashlib.sha256(png).hexdigest()[:16])
+        with self._lock:
+            self._charts[key] = entry
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.maxsize:
+                self._charts.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._charts)
@@ -0,0 +1,172 @@
+"""
+Cached access to the career dataset for the explorer pages.
+
+The CSV is read once and kept in memory together with its precomputed
+aggregates and per-column sort orders. Every access checks the file's mtime
+and size; when they change the file is hashed, and it is only re-parsed if
+the content actually differs. Table rows are served a page at a time.
+
+Text columns are stored as categoricals, so the aggregates the explorer
+charts need (career counts, GPA box-plot statistics per interest and the
+skill-by-interest cross-tab) are computed once per load from integer codes.
+Charts are drawn from these summaries; their size depends on the number of
+labels, not on the number of rows.
+"""
+import hashlib
+import os
+import threading
+import numpy as np
+from metrics import record_cache, stage
+
+DATASET_PATH = os.path.join('dataset', 'career_data.csv')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+GPA_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def categorize(df):
+    """Stores every text column as a categorical: one small code per row, each label once."""
+    text_columns = df.select_dtypes(exclude='number').columns
+    return df.astype({col: 'category' for col in text_columns})
+
+
+def gpa_box_stats(df, by='Interest'):
+    """
+    GPA summary per group for drawing box plots without the raw points:
+    count, mean, min, q1, median, q3, max and the Tukey whiskers (the most
+    extreme values within 1.5 IQR of the quartiles).
+    """
+    grouped = df.groupby(by, observed=True)['GPA']
+    stats = grouped.agg(['count', 'mean', 'min', 'max'])
+    quartiles = grouped.quantile(GPA_QUANTILES).unstack()
+    stats['q1'], stats['median'], stats['q3'] = (quartiles[q] for q in GPA_QUANTILES)
+    iqr = stats['q3'] - stats['q1']
+    codes = df[by].cat.codes.to_numpy()
+    inside = df['GPA'].between(
+        (stats['q1'] - 1.5 * iqr).reindex(df[by]).to_numpy(),
+        (stats['q3'] + 1.5 * iqr).reindex(df[by]).to_numpy(),
+    ) & (codes >= 0)
+    whiskers = df.loc[inside].groupby(by, observed=True)['GPA'].agg(['min', 'max'])
+    stats['lower_fence'], stats['upper_fence'] = whiskers['min'], whiskers['max']
+    return stats
+
+
+def crosstab(df, rows='Skills', columns='Interest'):
+    """Row counts for every (rows, columns) label pair, from the categorical codes."""
+    import pandas as pd
+    row_codes, col_codes = df[rows].cat.codes.to_numpy(), df[columns].cat.codes.to_numpy()
+    n_rows, n_cols = len(df[rows].cat.categories), len(df[columns].cat.categories)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    counts = np.bincount(
+        row_codes[valid].astype(np.int64) * n_cols + col_codes[valid], minlength=n_rows * n_cols
+    ).reshape(n_rows, n_cols)
+    return pd.DataFrame(counts, index=df[rows].cat.categories, columns=df[columns].cat.categories)
+
+
+class DatasetSnapshot:
+    """One immutable load of the dataset plus everything derived from it."""
+
+    def __init__(self, df, fingerprint):
+        import pandas as pd
+        df = categorize(df)
+        self.df = df
+        self.fingerprint = fingerprint
+        self.columns = list(df.columns)
+        self.career_counts = df['Recommended_Career'].value_counts()
+        self.gpa_by_interest = gpa_box_stats(df)
+        self.skills_by_interest = crosstab(df)
+        # Sorting once per load makes unfiltered sorted pages a slice.
+        # Categories are sorted, so ordering by code is ordering by label.
+        self.sort_orders = {
+            col: np.argsort(self._sort_key(col), kind='stable') for col in self.columns
+        }
+        text_columns = df.select_dtypes(include='category').columns
+        search_text = pd.Series('', index=df.index)
+        for col in text_columns:
+            search_text = search_text + ' ' + df[col].astype(str).str.lower()
+        self._search_text = search_text
+
+    def _sort_key(self, col):
+        column = self.df[col]
+        if column.dtype.name != 'category':
+            return column.to_numpy()
+        # Missing labels (code -1) sort last, as they would as NaN.
+        codes = column.cat.codes.to_numpy().astype(np.int64)
+        return np.where(codes < 0, len(column.cat.categories), codes)
+
+    def unique_skills_by_interest(self):
+        """Number of distinct skills seen with each interest."""
+        return (self.skills_by_interest > 0).sum(axis=0)
+
+    def page(self, page=1, per_page=DEFAULT_PAGE_SIZE, sort=None, descending=False, query=None, filters=None):
+        """Returns one page of rows after filtering and sorting, as a JSON-ready dict."""
+        per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+        page = max(1, int(page))
+        if sort is not None and sort not in self.sort_orders:
+            raise ValueError(f"Cannot sort by unknown column '{sort}'.")
+
+        mask = None
+        if query:
+            mask = self._search_text.str.contains(query.lower(), regex=False).to_numpy()
+        for col, value in (filters or {}).items():
+            if col not in self.columns:
+                raise ValueError(f"Cannot filter by unknown column '{col}'.")
+            column = self.df[col]
+            if column.dtype.name == 'category':
+                match = (column == value).to_numpy()
+            else:
+                match = (column.astype(str) == value).to_numpy()
+            mask = match if mask is None else mask & match
+
+        order = self.sort_orders[sort] if sort else np.arange(len(self.df))
+        if descending:
+            order = order[::-1]
+        if mask is not None:
+            order = order[mask[order]]
+
+        start = (page - 1) * per_page
+        rows = self.df.iloc[order[start:start + per_page]]
+        return {
+            'total': int(order.size),
+            'page': page,
+            'per_page': per_page,
+            'columns': self.columns,
+            'rows': rows.to_dict(orient='split')['data'],
+        }
+
+
+class DatasetService:
+    """Thread-safe holder of the current DatasetSnapshot for a CSV file."""
+
+    def __init__(self, path=DATASET_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stat = None
+        self._snapshot = None
+
+    def get(self):
+        """Returns the current snapshot, reloading it if the file content has changed."""
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            record_cache('dataset', hit=True)
+            return self._snapshot
+        with self._lock:
+            if key != self._stat:
+                fingerprint = _content_hash(self.path)
+                if self._snapshot is None or fingerprint != self._snapshot.fingerprint:
+                    record_cache('dataset', hit=False)
+                    with stage('dataset_load'):
+                        # pandas is imported on the first explorer request, not at worker boot.
+                        import pandas as pd
+                        self._snapshot = DatasetSnapshot(pd.read_csv(self.path), fingerprint)
+                self._stat = key
+            return self._snapshot
@@ -0,0 +1,162 @@
+"""
+Per-prediction explanations from the forest's own decision paths.
+
+Every node of a tree holds the class distribution of the training rows that
+reached it. Walking a profile from the root to its leaf, each split moves the
+probability of a career from the parent's value to the child's, and that move
+is credited to the input the split tested. Averaged over the trees, the root
+value (the baseline) plus the contributions of GPA, skill and interest add up
+exactly to the forest's predicted probability.
+
+A leaf is reached by exactly one path, so one top-down pass over the node
+arrays, a tree level at a time for all trees at once, gives every leaf's
+contributions. Explaining a profile is then the same traversal as predicting
+it plus a gather. For ordinal models the contributions are additionally
+computed for every (skill, interest, GPA cell) of the prediction lattice at
+training time and served by lookup.
+"""
+import os
+import numpy as np
+from forest_artifact import FlatForest, flatten_forest
+from lattice import LATTICE_K, cell_profiles, gpa_cells, top_k
+
+EXPLANATIONS_FILE = 'explanations.npy'
+BASELINE_FILE = 'explanation_baseline.npy'
+CONTRIBUTION_CHUNK_SIZE = 4096
+
+
+def as_flat_forest(model):
+    """Returns model as a FlatForest with internal node values, or None if they were never saved."""
+    if not hasattr(model, 'estimators_'):
+        return model if model.internal_values is not None else None
+    header = {
+        'n_features': model.n_features_in_,
+        'feature_importances': list(model.feature_importances_),
+        'classes': list(model.classes_),
+    }
+    return FlatForest(header, flatten_forest(model))
+
+
+def baseline(forest):
+    """The forest's average root distribution: its prediction before any split."""
+    roots = forest.roots
+    values = np.where(
+        (roots >= 0)[:, np.newaxis],
+        forest.internal_values[np.maximum(roots, 0)],
+        forest.values[np.maximum(-roots - 1, 0)],
+    )
+    return values.mean(axis=0)
+
+
+def leaf_contributions(forest, groups):
+    """
+    Path contributions of every leaf, shape (n_leaves, n_groups, n_classes).
+    groups maps each feature to the input it belongs to.
+    """
+    groups = np.asarray(groups, dtype=np.intp)
+    n_groups, n_classes = int(groups.max()) + 1, forest.values.shape[1]
+    internal = np.zeros((forest.internal_values.shape[0], n_groups, n_classes))
+    leaves = np.zeros((forest.values.shape[0], n_groups, n_classes))
+    parents = forest.roots[forest.roots >= 0]
+    while parents.size:
+        group = groups[forest.feature[parents]]
+        next_parents = []
+        for children in (forest.left[parents], forest.right[parents]):
+            is_internal = children >= 0
+            child_values = np.empty((children.size, n_classes))
+            child_values[is_internal] = forest.internal_values[children[is_internal]]
+            child_values[~is_internal] = forest.values[-children[~is_internal] - 1]
+            acc = internal[parents]
+            acc[np.arange(parents.size), group] += child_values - forest.internal_values[parents]
+            internal[children[is_internal]] = acc[is_internal]
+            leaves[-children[~is_internal] - 1] = acc[~is_internal]
+            next_parents.append(children[is_internal])
+        parents = np.concatenate(next_parents)
+    return leaves
+
+
+def explain_rows(forest, contributions, X, k=LATTICE_K):
+    """
+    Top-k careers of every row of X with the contribution of each input to them.
+    contributions comes from leaf_contributions. The trees are walked once for
+    both; probabilities are accumulated exactly as FlatForest.predict_proba does.
+    Returns (careers, probabilities, contributions of shape (n_samples, k, n_groups)).
+    """
+    n_groups, n_classes = contributions.shape[1:]
+    flat = contributions.reshape(-1)
+    careers, probs, explained = [], [], []
+    for start in range(0, X.shape[0], CONTRIBUTION_CHUNK_SIZE):
+        leaves = forest.apply(X[start:start + CONTRIBUTION_CHUNK_SIZE])
+        proba = np.zeros((leaves.shape[0], n_classes))
+        for t in range(leaves.shape[1]):
+            proba += forest.values[leaves[:, t]]
+        proba /= leaves.shape[1]
+        indices, top = top_k(proba, k)
+        # Only the top-k careers' columns are gathered, for every tree at once:
+        # index (row, tree, career rank, input) -> leaf * n_groups * n_classes + input * n_classes + career.
+        offsets = np.arange(n_groups) * n_classes + indices[:, np.newaxis, :, np.newaxis]
+        picked = flat[leaves[:, :, np.newaxis, np.newaxis] * (n_groups * n_classes) + offsets]
+        careers.append(indices)
+        probs.append(top)
+        explained.append(picked.sum(axis=1) / leaves.shape[1])
+    return np.concatenate(careers), np.concatenate(probs), np.concatenate(explained)
+
+
+def build_explanations(forest, lattice):
+    """Contributions of (GPA, skill, interest) to the top-k careers of every lattice cell."""
+    features, shape = cell_profiles(lattice.edges, *lattice.shape[:2])
+    contributions = leaf_contributions(forest, np.arange(features.shape[1]))
+    _, _, explained = explain_rows(forest, contributions, features, lattice.k)
+    # Stored as (skill, interest, cell, career rank, input) to match the lattice.
+    table = explained.reshape(shape + explained.shape[1:])
+    return ExplanationTable(table.astype(np.float32), baseline(forest), lattice.edges)
+
+
+class ExplanationTable:
+    """Per-input contributions to the top-k careers, indexed like the prediction lattice."""
+
+    def __init__(self, table, baseline, edges):
+        self.table = table
+        self.baseline = baseline
+        self.edges = edges
+
+    @property
+    def shape(self):
+        return self.table.shape
+
+    def lookup(self, gpa, skill_encoded, interest_encoded):
+        """Returns the (k, n_inputs) contributions for one profile, in lattice career order."""
+        return np.asarray(self.table[skill_encoded, interest_encoded, gpa_cells(self.edges, gpa)], dtype=np.float64)
+
+    def save(self, model_dir):
+        np.save(os.path.join(model_dir, EXPLANATIONS_FILE), self.table)
+        np.save(os.path.join(model_dir, BASELINE_FILE), self.baseline)
+
+    @classmethod
+    def load(cls, model_dir, edges):
+        table = np.load(os.path.join(model_dir, EXPLANATIONS_FILE), mmap_mode='r')
+        return cls(table, np.load(os.path.join(model_dir, BASELINE_FILE)), edges)
+
+
+def load_explanations(lattice, model_dir):
+    """Loads the version's explanation table if it matches its lattice, otherwise returns None."""
+    if lattice is None:
+        return None
+    try:
+        explanations = ExplanationTable.load(model_dir, lattice.edges)
+    except (FileNotFoundError, ValueError):
+        return None
+    if explanations.shape[:4] != lattice.shape + (lattice.k,):
+        return None
+    return explanations
+
+
+def verify_explanations(explanations, lattice, atol=1e-5):
+    """
+    Checks that baseline plus contributions adds up to the lattice's probabilities.
+    Returns (cells checked, cells that disagree).
+    """
+    careers = np.asarray(lattice.table['career'], dtype=np.intp)
+    totals = explanations.baseline[careers] + np.asarray(explanations.table, dtype=np.float64).sum(axis=-1)
+    wrong = ~np.isclose(totals, lattice.table['prob'], rtol=0, atol=atol).all(axis=-1)
+    return wrong.size, int(wrong.sum())
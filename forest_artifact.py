@@ -0,0 +1,325 @@
+"""
+Flat, memory-mappable artifact format for the career forest.
+
+Unpickling model.pkl rebuilds 100 sklearn tree objects and runs arbitrary
+code. This module instead stores every tree's nodes in a few contiguous
+NumPy buffers plus the class vocabularies, all in one file:
+
+    b'CRFOREST' | uint32 header length | JSON header | 64-byte aligned buffers
+
+Internal nodes of all trees share one set of arrays (feature, threshold,
+left, right, internal_values). A child reference >= 0 is another internal
+node, and a negative reference -(i + 1) is row i of the leaf probability
+table. internal_values holds each internal node's class distribution, which
+per-prediction explanations need; artifacts written before it existed still
+load and predict. Loading only memory-maps the file, so worker processes
+share one page-cached copy, and predict_proba is a vectorized traversal that
+reproduces sklearn's result bit for bit. The traversal beats sklearn's
+per-call overhead up to a few hundred rows; model_registry hands larger
+batches to the pickled estimator where a version still has one.
+"""
+import json
+import os
+import struct
+import sys
+import numpy as np
+
+FOREST_FILE = 'model.forest'
+MAGIC = b'CRFOREST'
+FORMAT_VERSION = 1
+ALIGN = 64
+PREDICT_CHUNK_SIZE = 65536
+# Sparse rows are densified a chunk at a time, at most this many cells per chunk.
+DENSE_CHUNK_CELLS = 1 << 22
+
+
+class Vocabulary:
+    """Read-only stand-in for a fitted LabelEncoder, rebuilt from a list of classes."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._codes = {label: code for code, label in enumerate(classes)}
+
+    def transform(self, values):
+        try:
+            return np.array([self._codes[value] for value in values], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e.args[0]!r}") from None
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.intp)]
+
+
+def flatten_forest(model):
+    """Concatenates the node arrays of every tree in a fitted forest."""
+    n_classes = len(model.classes_)
+    # Multi-hot vocabularies can outgrow int16 feature indices.
+    feature_dtype = np.int16 if model.n_features_in_ <= np.iinfo(np.int16).max else np.int32
+    feature, threshold, left, right, values, internal_values, roots = [], [], [], [], [], [], []
+    n_internal = n_leaves = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        internal_ids = np.flatnonzero(~is_leaf)
+        leaf_ids = np.flatnonzero(is_leaf)
+
+        ref = np.empty(tree.node_count, dtype=np.int32)
+        ref[internal_ids] = n_internal + np.arange(internal_ids.size)
+        ref[leaf_ids] = -(n_leaves + np.arange(leaf_ids.size) + 1)
+
+        feature.append(tree.feature[internal_ids].astype(feature_dtype))
+        threshold.append(tree.threshold[internal_ids])
+        left.append(ref[tree.children_left[internal_ids]])
+        right.append(ref[tree.children_right[internal_ids]])
+        leaf_values = tree.value[leaf_ids, 0, :n_classes].astype(np.float64)
+        normalizer = leaf_values.sum(axis=1)[:, np.newaxis]
+        # scikit-learn >= 1.4 stores class fractions and predict_proba returns them
+        # as is; older releases store counts and normalize at predict time.
+        if not np.allclose(normalizer, 1.0):
+            normalizer[normalizer == 0.0] = 1.0
+            leaf_values = leaf_values / normalizer
+        values.append(leaf_values)
+        node_values = tree.value[internal_ids, 0, :n_classes].astype(np.float64)
+        internal_values.append(node_values / node_values.sum(axis=1)[:, np.newaxis])
+        roots.append(ref[0])
+
+        n_internal += internal_ids.size
+        n_leaves += leaf_ids.size
+
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'values': np.concatenate(values),
+        'internal_values': np.concatenate(internal_values),
+        'roots': np.array(roots, dtype=np.int32),
+    }
+
+
+def export_forest(model, le_skills, le_interest, le_career, model_dir='model'):
+    """
+    Writes the forest and its vocabularies to model_dir/model.forest and returns the path.
+    model is a fitted sklearn forest or a FlatForest, such as a compressed one.
+    """
+    arrays = flatten_forest(model) if hasattr(model, 'estimators_') else model.arrays
+    return write_forest(
+        arrays, model.n_features_in_, model.feature_importances_, model.classes_,
+        le_skills, le_interest, le_career, model_dir,
+        feature_names=getattr(model, 'feature_names_in_', []),
+    )
+
+
+def write_forest(arrays, n_features, feature_importances, classes, le_skills, le_interest, le_career,
+                 model_dir='model', feature_names=()):
+    """Writes already flattened node arrays and their metadata as model_dir/model.forest."""
+    header = {
+        'format_version': FORMAT_VERSION,
+        'n_features': int(n_features),
+        'feature_names': [str(name) for name in feature_names],
+        'feature_importances': [float(v) for v in feature_importances],
+        'classes': [int(c) for c in classes],
+        'vocabularies': {
+            'skills': [str(c) for c in le_skills.classes_],
+            'interest': [str(c) for c in le_interest.classes_],
+            'career': [str(c) for c in le_career.classes_],
+        },
+        'arrays': {},
+    }
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        header['arrays'][name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+        }
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+
+    header_bytes = json.dumps(header).encode()
+    prefix = len(MAGIC) + 4 + len(header_bytes)
+    data_start = -(-prefix // ALIGN) * ALIGN
+
+    path = os.path.join(model_dir, FOREST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _issparse(X):
+    # A sparse matrix can only exist once something imported scipy.sparse, so
+    # dense-only processes never pay for importing it.
+    sparse = sys.modules.get('scipy.sparse')
+    return sparse is not None and sparse.issparse(X)
+
+
+class FlatForest:
+    """Pure-NumPy forest that answers predict_proba from the flattened node arrays."""
+
+    def __init__(self, header, arrays):
+        self.n_features_in_ = header['n_features']
+        self.feature_importances_ = np.array(header['feature_importances'])
+        self.classes_ = np.array(header['classes'])
+        self.arrays = arrays
+        self.feature = arrays['feature'].astype(np.intp)
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.values = arrays['values']
+        self.internal_values = arrays.get('internal_values')
+        self.roots = arrays['roots']
+        self._traversal = None
+
+    @property
+    def n_estimators(self):
+        return self.roots.size
+
+    def _traversal_arrays(self):
+        """
+        Node arrays in which leaf i is node n_internal + i and points to itself, so
+        a step from any node is one gather. Built on first use; lattice-only
+        processes never pay for them.
+        """
+        if self._traversal is None:
+            n_internal, n_leaves = self.left.size, self.values.shape[0]
+            leaves = np.arange(n_internal, n_internal + n_leaves)
+
+            def node_ids(refs):
+                return np.where(refs >= 0, refs, n_internal - 1 - refs.astype(np.intp))
+
+            self._traversal = (
+                n_internal,
+                np.concatenate([self.feature, np.zeros(n_leaves, dtype=np.intp)]),
+                # A leaf's +inf threshold always sends it left, to itself.
+                np.concatenate([self.threshold, np.full(n_leaves, np.inf)]),
+                np.column_stack([
+                    np.concatenate([node_ids(self.left), leaves]),
+                    np.concatenate([node_ids(self.right), leaves]),
+                ]).ravel(),
+                node_ids(self.roots),
+            )
+        return self._traversal
+
+    def _apply_dense(self, X):
+        # Trees compare float32 features against float64 thresholds, like sklearn.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        n_internal, feature, threshold, children, roots = self._traversal_arrays()
+        cells = X.ravel()
+        nodes = np.tile(roots, n_samples)
+        row_starts = np.repeat(np.arange(n_samples, dtype=np.intp) * n_features, roots.size)
+        positions = np.arange(nodes.size)
+        leaves = np.empty(nodes.size, dtype=np.intp)
+        while nodes.size:
+            nodes = children[2 * nodes + (cells[row_starts + feature[nodes]] > threshold[nodes])]
+            done = nodes >= n_internal
+            n_done = np.count_nonzero(done)
+            # Finished paths idle on their leaf; they are dropped once they are
+            # half of the active ones, so most steps skip the compaction.
+            if 2 * n_done >= nodes.size:
+                leaves[positions[done]] = nodes[done]
+                keep = ~done
+                nodes, row_starts, positions = nodes[keep], row_starts[keep], positions[keep]
+        return (leaves - n_internal).reshape(n_samples, roots.size)
+
+    def apply(self, X):
+        """Returns the leaf row reached in every tree, shape (n_samples, n_trees)."""
+        if not _issparse(X):
+            return self._apply_dense(X)
+        # CSR rows are densified a bounded chunk at a time; the whole matrix never is.
+        X = X.tocsr()
+        chunk_size = max(1, DENSE_CHUNK_CELLS // max(1, X.shape[1]))
+        leaves = [
+            self._apply_dense(X[start:start + chunk_size].toarray())
+            for start in range(0, X.shape[0], chunk_size)
+        ]
+        return np.concatenate(leaves) if leaves else self._apply_dense(np.empty((0, X.shape[1])))
+
+    def predict_proba(self, X):
+        X = X.tocsr() if _issparse(X) else np.asarray(X)
+        proba = np.empty((X.shape[0], self.values.shape[1]))
+        for start in range(0, X.shape[0], PREDICT_CHUNK_SIZE):
+            leaves = self.apply(X[start:start + PREDICT_CHUNK_SIZE])
+            # Summed tree by tree, in order, to match the forest's accumulation.
+            chunk = np.zeros((leaves.shape[0], self.values.shape[1]))
+            for t in range(leaves.shape[1]):
+                chunk += self.values[leaves[:, t]]
+            chunk /= leaves.shape[1]
+            proba[start:start + PREDICT_CHUNK_SIZE] = chunk
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_forest(model_dir='model'):
+    """
+    Memory-maps model_dir/model.forest.
+    Returns (FlatForest, skills Vocabulary, interest Vocabulary, career Vocabulary).
+    """
+    path = os.path.join(model_dir, FOREST_FILE)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a forest artifact.")
+    (header_len,) = struct.unpack('<I', bytes(buffer[len(MAGIC):len(MAGIC) + 4]))
+    header_end = len(MAGIC) + 4 + header_len
+    header = json.loads(bytes(buffer[len(MAGIC) + 4:header_end]))
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported forest artifact version {header['format_version']}.")
+    data_start = -(-header_end // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        start = data_start + spec['offset']
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    vocabularies = header['vocabularies']
+    return (
+        FlatForest(header, arrays),
+        Vocabulary(vocabularies['skills']),
+        Vocabulary(vocabularies['interest']),
+        Vocabulary(vocabularies['career']),
+    )
+
+
+def probe_profiles(n_skills, n_interests, n=20000, seed=0):
+    """Random encoded (GPA, skill, interest) rows covering the whole input space."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0.0, 10.0, n),
+        rng.integers(0, n_skills, n),
+        rng.integers(0, n_interests, n),
+    ])
+
+
+def verify_forest(flat, model, X):
+    """Returns True if the flat forest's predict_proba is bit-identical to the sklearn forest's."""
+    return np.array_equal(flat.predict_proba(X), model.predict_proba(X))
+
+
+if __name__ == "__main__":
+    # Exports the flat artifact next to the saved pickles without retraining.
+    from joblib import load
+    from model_registry import active_version_dir
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else active_version_dir()[1]
+    model = load(os.path.join(model_dir, 'model.pkl'))
+    le_skills = load(os.path.join(model_dir, 'skills_encoder.pkl'))
+    le_interest = load(os.path.join(model_dir, 'interest_encoder.pkl'))
+    le_career = load(os.path.join(model_dir, 'career_encoder.pkl'))
+    path = export_forest(model, le_skills, le_interest, le_career, model_dir)
+    flat = load_forest(model_dir)[0]
+    X = probe_profiles(len(le_skills.classes_), len(le_interest.classes_))
+    if not verify_forest(flat, model, X):
+        os.remove(path)
+        sys.exit("Flat forest does not reproduce predict_proba exactly; artifact removed.")
+    print(f"Saved {path} ({os.path.getsize(path)} bytes, {flat.n_estimators} trees, exact on {len(X)} profiles).")
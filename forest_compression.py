@@ -0,0 +1,400 @@
+"""
+Compression of a trained forest into a smaller serving artifact.
+
+A forest of 100 fully grown trees is far larger than a dataset of a few
+hundred rows needs, and every live prediction walks all of it. This module
+searches for a smaller model that predicts almost as well:
+
+    subsets    the trees are ordered greedily, each next tree being the one
+               that makes the prefix agree most often with the full forest's
+               predictions on the training rows (no labels are used), and
+               prefixes of growing length are tried
+    depth      every tree of a subset is cut at a maximum depth; a cut node
+               becomes a leaf predicting the class distribution stored for it
+    distilled  optionally, one shallow regression tree fitted to the full
+               forest's probabilities on the training rows plus random probe
+               profiles covering the input space
+
+Each candidate is scored for artifact size, single-profile latency, accuracy,
+probability drift and top-3 agreement with the full forest. The settings are
+chosen with a forest fitted without some validation rows: the smallest
+candidate whose accuracy on them is within the tolerance of that forest's,
+whose drift and top-3 agreement are within bounds, and which does not put all
+probability on one career. The chosen settings are then applied to the forest
+fitted on all training rows (rederive), and both are reported on the untouched
+test rows. Candidates are FlatForest arrays, so the chosen one is saved,
+served and explained exactly like a full model.
+"""
+import json
+import os
+import time
+import numpy as np
+from forest_artifact import FlatForest
+
+COMPRESSION_FILE = 'compression.json'
+SUBSET_SIZES = [1, 2, 5, 10, 20, 35, 50, 75]
+DEPTH_LIMITS = [None, 16, 12, 8, 6, 4]
+DISTILL_DEPTHS = [6, 8, 10, 12, 16]
+ORDER_SAMPLE_ROWS = 2000
+EVAL_ROWS = 20000
+LATENCY_REPEATS = 50
+RANDOM_STATE = 42
+# Acceptance bounds on the validation rows, besides the accuracy tolerance.
+MAX_DRIFT = 0.1
+TOP_K = 3
+MIN_TOP_K_AGREEMENT = 0.8
+# Share of profiles given a single career with probability 1 from which a
+# model counts as degenerate: its other recommendations would be arbitrary.
+DEGENERATE_SHARE = 0.99
+
+
+def _dense_or_csr(X):
+    return X.tocsr() if hasattr(X, 'tocsr') else np.asarray(X, dtype=np.float64)
+
+
+def _sample_rows(X, y=None, n=EVAL_ROWS, seed=RANDOM_STATE):
+    """At most n rows of X (and y), drawn reproducibly; smaller inputs are returned whole."""
+    X = _dense_or_csr(X)
+    if X.shape[0] <= n:
+        return X if y is None else (X, np.asarray(y))
+    rows = np.sort(np.random.default_rng(seed).choice(X.shape[0], n, replace=False))
+    return X[rows] if y is None else (X[rows], np.asarray(y)[rows])
+
+
+def _header(forest, feature_importances=None):
+    return {
+        'n_features': forest.n_features_in_,
+        # Impurity decreases are not kept in the flat arrays; a pruned forest
+        # reports the full forest's importances.
+        'feature_importances': list(forest.feature_importances_ if feature_importances is None else feature_importances),
+        'classes': list(forest.classes_),
+    }
+
+
+def prune_forest(forest, trees=None, max_depth=None):
+    """
+    Flat arrays holding the given trees of a FlatForest, each cut at max_depth.
+    Nodes are renumbered level by level, so arrays hold only reachable nodes.
+    """
+    trees = np.arange(forest.n_estimators) if trees is None else np.asarray(trees, dtype=np.intp)
+    if max_depth is not None and forest.internal_values is None:
+        raise ValueError("cutting trees needs the internal node values of a current forest artifact")
+    feature_dtype = np.int16 if forest.n_features_in_ <= np.iinfo(np.int16).max else np.int32
+    n_classes = forest.values.shape[1]
+    parts = {
+        'feature': [np.empty(0, dtype=feature_dtype)],
+        'threshold': [np.empty(0)],
+        'left': [np.empty(0, dtype=np.int32)],
+        'right': [np.empty(0, dtype=np.int32)],
+        'values': [np.empty((0, n_classes))],
+        'internal_values': [np.empty((0, n_classes))],
+    }
+    pending = forest.roots[trees]
+    roots = None
+    n_parents = n_internal = n_leaves = depth = 0
+    while pending.size:
+        keep = pending >= 0
+        if max_depth is not None and depth >= max_depth:
+            keep[:] = False
+        kept, cut = pending[keep], pending[~keep]
+        refs = np.empty(pending.size, dtype=np.int32)
+        refs[keep] = n_internal + np.arange(kept.size)
+        refs[~keep] = -(n_leaves + np.arange(cut.size) + 1)
+        if depth == 0:
+            roots = refs
+        else:
+            # Children were queued as all left children, then all right children.
+            parts['left'].append(refs[:n_parents])
+            parts['right'].append(refs[n_parents:])
+
+        # New leaves are old leaves or internal nodes cut at max_depth.
+        values = np.empty((cut.size, n_classes))
+        is_leaf = cut < 0
+        values[is_leaf] = forest.values[-cut[is_leaf] - 1]
+        if not is_leaf.all():
+            values[~is_leaf] = forest.internal_values[cut[~is_leaf]]
+        parts['values'].append(values)
+        parts['feature'].append(forest.feature[kept].astype(feature_dtype))
+        parts['threshold'].append(forest.threshold[kept])
+        if forest.internal_values is not None:
+            parts['internal_values'].append(forest.internal_values[kept])
+
+        pending = np.concatenate([forest.left[kept], forest.right[kept]])
+        n_parents = kept.size
+        n_internal += kept.size
+        n_leaves += cut.size
+        depth += 1
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    arrays['roots'] = roots
+    if forest.internal_values is None:
+        del arrays['internal_values']
+    return arrays
+
+
+def order_trees(forest, X):
+    """
+    Orders the trees so that every prefix agrees as often as possible with the
+    full forest's predicted career on X (greedy forward selection).
+    """
+    leaves = forest.apply(X)
+    per_tree = forest.values[leaves]
+    target = per_tree.sum(axis=1).argmax(axis=1)
+    total = np.zeros((leaves.shape[0], forest.values.shape[1]))
+    remaining = list(range(forest.n_estimators))
+    order = []
+    while remaining:
+        candidates = total[:, np.newaxis, :] + per_tree[:, remaining, :]
+        agreement = (candidates.argmax(axis=2) == target[:, np.newaxis]).sum(axis=0)
+        best = remaining.pop(int(np.argmax(agreement)))
+        total += per_tree[:, best, :]
+        order.append(best)
+    return np.array(order, dtype=np.intp)
+
+
+def distill_tree(forest, X, max_depth, probes=None):
+    """
+    Fits one regression tree of at most max_depth to the forest's probabilities
+    on X plus probe profiles; returns its flat arrays and feature importances.
+    """
+    from sklearn.tree import DecisionTreeRegressor
+    if probes is not None:
+        if hasattr(X, 'tocsr'):
+            from scipy import sparse
+            X = sparse.vstack([X, probes]).tocsr()
+        else:
+            X = np.vstack([X, np.asarray(probes, dtype=np.float64)])
+    tree = DecisionTreeRegressor(max_depth=max_depth, random_state=RANDOM_STATE)
+    tree.fit(X, forest.predict_proba(X))
+
+    # Each node's value is the mean probability vector of its rows, shape (n_nodes, n_classes, 1).
+    t = tree.tree_
+    node_values = t.value[:, :, 0].astype(np.float64)
+    is_leaf = t.children_left == -1
+    internal_ids, leaf_ids = np.flatnonzero(~is_leaf), np.flatnonzero(is_leaf)
+    ref = np.empty(t.node_count, dtype=np.int32)
+    ref[internal_ids] = np.arange(internal_ids.size)
+    ref[leaf_ids] = -(np.arange(leaf_ids.size) + 1)
+    feature_dtype = np.int16 if forest.n_features_in_ <= np.iinfo(np.int16).max else np.int32
+    arrays = {
+        'feature': t.feature[internal_ids].astype(feature_dtype),
+        'threshold': t.threshold[internal_ids],
+        'left': ref[t.children_left[internal_ids]],
+        'right': ref[t.children_right[internal_ids]],
+        'values': node_values[leaf_ids],
+        'internal_values': node_values[internal_ids],
+        'roots': np.array([ref[0]], dtype=np.int32),
+    }
+    return arrays, tree.feature_importances_
+
+
+class Candidate:
+    """One compressed model: its flat arrays plus what it costs and how well it predicts."""
+
+    def __init__(self, kind, arrays, header, trees, max_depth):
+        self.kind = kind
+        self.arrays = arrays
+        self.forest = FlatForest(header, arrays)
+        self.trees = trees
+        self.max_depth = max_depth
+        self.scores = {}
+        # Probabilities and top-k careers per split, kept for the full forest only.
+        self.predictions = {}
+        self.latency_ms = None
+
+    @property
+    def n_nodes(self):
+        return int(self.arrays['feature'].size + self.arrays['values'].shape[0])
+
+    @property
+    def size_kb(self):
+        return sum(array.nbytes for array in self.arrays.values()) / 1024
+
+    @property
+    def degenerate(self):
+        """True if the model puts all probability on one career for almost every validation profile."""
+        return self.scores['validation']['certain'] >= DEGENERATE_SHARE
+
+    def score(self, X, y, reference=None):
+        """
+        Scores the model on (X, y). Given the full forest's predictions on X, also
+        measures how far this model's probabilities and top-k careers depart from them.
+        Returns the scores and this model's (probabilities, top-k careers).
+        """
+        proba = self.forest.predict_proba(X)
+        # Ties are ranked by class index, as the apps rank them.
+        top = np.argsort(-proba, axis=1, kind='stable')[:, :TOP_K]
+        scores = {
+            'accuracy': float((self.forest.classes_[top[:, 0]] == y).mean()),
+            'certain': float((proba.max(axis=1) >= 1 - 1e-9).mean()),
+        }
+        if reference is None:
+            scores.update(drift=0.0, top_k_agreement=1.0)
+        else:
+            # Mean total variation distance: 0 for identical probabilities, 1 for disjoint ones.
+            reference_proba, reference_top = reference
+            scores['drift'] = float(np.abs(proba - reference_proba).sum(axis=1).mean() / 2)
+            shared = (top[:, :, np.newaxis] == reference_top[:, np.newaxis, :]).any(axis=2)
+            scores['top_k_agreement'] = float(shared.mean())
+        return scores, (proba, top)
+
+    def evaluate(self, splits, single, reference=None):
+        """
+        Scores the model on each named (X, y) split, against the reference
+        candidate's scores on the same split, and times one-profile predictions.
+        """
+        for name, (X, y) in splits.items():
+            self.scores[name], predictions = self.score(X, y, None if reference is None else reference.predictions[name])
+            if reference is None:
+                self.predictions[name] = predictions
+        latencies = []
+        for _ in range(LATENCY_REPEATS):
+            start = time.perf_counter()
+            self.forest.predict_proba(single)
+            latencies.append(time.perf_counter() - start)
+        self.latency_ms = float(np.median(latencies) * 1000)
+        return self
+
+    def summary(self, reference=None):
+        summary = {
+            'kind': self.kind,
+            'trees': self.trees,
+            'max_depth': self.max_depth,
+            'nodes': self.n_nodes,
+            'size_kb': round(self.size_kb, 1),
+            'latency_ms': round(self.latency_ms, 4),
+        }
+        for name, scores in self.scores.items():
+            summary[name] = {
+                'accuracy': scores['accuracy'],
+                'probability_drift': round(scores['drift'], 4),
+                f'top_{TOP_K}_agreement': round(scores['top_k_agreement'], 4),
+                'certain_share': round(scores['certain'], 4),
+            }
+            if reference is not None:
+                summary[name]['accuracy_change'] = scores['accuracy'] - reference.scores[name]['accuracy']
+        return summary
+
+
+def build_candidate(forest, kind, trees, max_depth, X_train, probes=None, order=None):
+    """
+    Derives one candidate from a FlatForest: the first trees of its greedy tree
+    order cut at max_depth, or for kind 'distilled' one tree of max_depth.
+    """
+    if kind == 'distilled':
+        arrays, importances = distill_tree(forest, _sample_rows(X_train), max_depth, probes)
+        return Candidate(kind, arrays, _header(forest, importances), 1, max_depth)
+    if order is None:
+        order = order_trees(forest, _sample_rows(X_train, n=ORDER_SAMPLE_ROWS))
+    return Candidate(kind, prune_forest(forest, np.sort(order[:trees]), max_depth), _header(forest), trees, max_depth)
+
+
+def compress_forest(forest, X_train, X_val, y_val, tolerance=0.01, max_drift=MAX_DRIFT,
+                    min_agreement=MIN_TOP_K_AGREEMENT, distill=False, probes=None,
+                    subset_sizes=SUBSET_SIZES, depth_limits=DEPTH_LIMITS, distill_depths=DISTILL_DEPTHS):
+    """
+    Evaluates every compression candidate of a FlatForest (with internal node values)
+    fitted on X_train, on validation rows it was not fitted on.
+    Returns (reference, candidates sorted by size, chosen): the full forest, all
+    candidates, and the smallest acceptable one, or the full forest if none is.
+
+    A candidate is acceptable if its validation accuracy is within tolerance of
+    the full forest's, its probabilities drift at most max_drift, its top-k
+    careers agree with the full forest's at least min_agreement of the time,
+    and it is not degenerate.
+    """
+    splits = {'validation': _sample_rows(X_val, y_val)}
+    single = splits['validation'][0][:1]
+
+    reference = Candidate('full', prune_forest(forest), _header(forest), forest.n_estimators, None).evaluate(splits, single)
+    order = order_trees(forest, _sample_rows(X_train, n=ORDER_SAMPLE_ROWS))
+    candidates = []
+    sizes = sorted({size for size in subset_sizes if size < forest.n_estimators} | {forest.n_estimators})
+    for size in sizes:
+        for max_depth in depth_limits:
+            if size == forest.n_estimators and max_depth is None:
+                continue
+            candidate = build_candidate(forest, 'subset', size, max_depth, X_train, order=order)
+            candidates.append(candidate.evaluate(splits, single, reference))
+    if distill:
+        for max_depth in distill_depths:
+            candidate = build_candidate(forest, 'distilled', 1, max_depth, X_train, probes)
+            candidates.append(candidate.evaluate(splits, single, reference))
+
+    baseline = reference.scores['validation']
+
+    def acceptable(candidate):
+        scores = candidate.scores['validation']
+        # A depth limit deeper than every tree leaves the full forest as it was.
+        return (
+            candidate.n_nodes < reference.n_nodes
+            and scores['accuracy'] >= baseline['accuracy'] - tolerance
+            and scores['drift'] <= max_drift
+            and scores['top_k_agreement'] >= min_agreement
+            and not candidate.degenerate
+        )
+
+    candidates.sort(key=lambda c: (c.size_kb, c.latency_ms))
+    close = [c for c in candidates if acceptable(c)]
+    chosen = close[0] if close else reference
+    return reference, candidates, chosen
+
+
+def rederive(forest, chosen, X_train, X_test, y_test, probes=None):
+    """
+    Applies the chosen candidate's settings to a FlatForest fitted on all training
+    rows and scores both on the test rows. Returns (reference, candidate).
+    """
+    splits = {'test': _sample_rows(X_test, y_test)}
+    single = splits['test'][0][:1]
+    reference = Candidate('full', prune_forest(forest), _header(forest), forest.n_estimators, None).evaluate(splits, single)
+    candidate = build_candidate(forest, chosen.kind, chosen.trees, chosen.max_depth, X_train, probes)
+    return reference, candidate.evaluate(splits, single, reference)
+
+
+def pareto_front(candidates):
+    """Candidates no other candidate beats on both size and validation accuracy, smallest first."""
+    front, best = [], -1.0
+    accuracy = lambda c: c.scores['validation']['accuracy']
+    for candidate in sorted(candidates, key=lambda c: (c.size_kb, -accuracy(c))):
+        if accuracy(candidate) > best:
+            front.append(candidate)
+            best = accuracy(candidate)
+    return front
+
+
+def compression_report(selection, reference, chosen, tolerance, max_drift=MAX_DRIFT,
+                       min_agreement=MIN_TOP_K_AGREEMENT, parent=None):
+    """
+    selection is compress_forest's (reference, candidates, chosen) on the validation
+    rows; reference and chosen are the saved full forest and compressed model.
+    """
+    selection_reference, candidates, selected = selection
+    return {
+        'parent': parent,
+        'tolerance': tolerance,
+        'max_drift': max_drift,
+        f'min_top_{TOP_K}_agreement': min_agreement,
+        'reference': reference.summary(),
+        'chosen': chosen.summary(reference),
+        'selection': {
+            'reference': selection_reference.summary(),
+            'chosen': selected.summary(selection_reference),
+            'candidates': [candidate.summary(selection_reference) for candidate in candidates],
+        },
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def save_report(report, model_dir):
+    with open(os.path.join(model_dir, COMPRESSION_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(model_dir):
+    """Returns the version's compression report, or None if it is not a compressed model."""
+    try:
+        with open(os.path.join(model_dir, COMPRESSION_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
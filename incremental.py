@@ -0,0 +1,224 @@
+"""
+Incremental model updates from rows appended to the training CSV.
+
+Every model version records a data watermark: the byte offset and row count
+of the CSV it was trained up to, plus a hash of the bytes just before the
+offset so a rewritten (rather than appended) file is detected. An update
+reads only the bytes after the watermark, so its cost depends on the size of
+the delta, not on the history.
+
+New skills, interests and careers are appended to the vocabularies, so every
+existing code keeps its meaning and the trees already trained stay valid. The
+update fits a handful of new trees on the delta (warm-start style) and appends
+them to the flat forest artifact. Their class columns are remapped into the
+extended career vocabulary, and the columns of careers an old tree has never
+seen are zero, exactly what a forest fitted on that data would predict.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import numpy as np
+from forest_artifact import FOREST_FILE, FlatForest, Vocabulary, flatten_forest, load_forest, write_forest
+
+WATERMARK_FILE = 'watermark.json'
+TAIL_BYTES = 4096
+NEW_TREES = 10
+FEATURE_COLUMNS = ['GPA', 'Skills', 'Interest']
+TARGET_COLUMN = 'Recommended_Career'
+
+
+def _tail_hash(path, offset):
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - TAIL_BYTES))
+        return hashlib.sha256(f.read(offset - max(0, offset - TAIL_BYTES))).hexdigest()
+
+
+def data_watermark(path, rows, offset=None, parent=None):
+    """Describes how far into path a model was trained; offset defaults to the current file size."""
+    offset = os.path.getsize(path) if offset is None else offset
+    return {
+        'source': os.path.abspath(path),
+        'offset': offset,
+        'rows': int(rows),
+        'tail_sha256': _tail_hash(path, offset),
+        'parent': parent,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def save_watermark(watermark, model_dir):
+    with open(os.path.join(model_dir, WATERMARK_FILE), 'w') as f:
+        json.dump(watermark, f, indent=2)
+
+
+def load_watermark(model_dir):
+    """Returns the version's watermark dict, or None for versions trained before watermarks existed."""
+    try:
+        with open(os.path.join(model_dir, WATERMARK_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_delta(path, watermark):
+    """
+    Reads only the rows appended to path after the watermark.
+    Returns (DataFrame, end offset). Raises ValueError if the file was rewritten.
+    """
+    import pandas as pd
+    size = os.path.getsize(path)
+    offset = watermark['offset']
+    if size < offset or _tail_hash(path, offset) != watermark['tail_sha256']:
+        raise ValueError(f"'{path}' changed before the watermark of the current model; run a full training instead")
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        body = f.read(size - offset)
+    # Only whole lines are consumed; a partially written last line waits for the next update.
+    end = body.rfind(b'\n') + 1
+    return pd.read_csv(io.BytesIO(header + body[:end])), offset + end
+
+
+def extend_vocabulary(vocabulary, labels):
+    """Appends unseen labels (sorted) after the existing classes, leaving existing codes unchanged."""
+    known = set(vocabulary.classes_)
+    new = sorted({label for label in labels if label not in known})
+    return Vocabulary(list(vocabulary.classes_) + new), new
+
+
+def load_base(model_dir):
+    """Returns (FlatForest, skills, interest, career vocabularies) of a version, from model.forest or its pickles."""
+    if os.path.exists(os.path.join(model_dir, FOREST_FILE)):
+        return load_forest(model_dir)
+    from joblib import load
+    model = load(os.path.join(model_dir, 'model.pkl'))
+    header = {
+        'n_features': model.n_features_in_,
+        'feature_importances': list(model.feature_importances_),
+        'classes': list(model.classes_),
+    }
+    vocabularies = [
+        Vocabulary(load(os.path.join(model_dir, name)).classes_)
+        for name in ('skills_encoder.pkl', 'interest_encoder.pkl', 'career_encoder.pkl')
+    ]
+    return (FlatForest(header, flatten_forest(model)), *vocabularies)
+
+
+def _widen_values(values, classes, n_classes):
+    """Scatters leaf probabilities for the given class codes into n_classes columns."""
+    widened = np.zeros((values.shape[0], n_classes))
+    widened[:, np.asarray(classes, dtype=np.intp)] = values
+    return widened
+
+
+def widen_forest(model, n_classes):
+    """
+    Returns a fitted forest as a FlatForest whose probability columns are the
+    career codes 0..n_classes-1, for forests fitted without rows of some careers.
+    """
+    arrays = flatten_forest(model)
+    for name in ('values', 'internal_values'):
+        arrays[name] = _widen_values(arrays[name], model.classes_, n_classes)
+    header = {
+        'n_features': model.n_features_in_,
+        'feature_importances': list(model.feature_importances_),
+        'classes': list(range(n_classes)),
+    }
+    return FlatForest(header, arrays)
+
+
+def append_trees(base, new_model, n_classes):
+    """Returns flat arrays holding the base forest's trees followed by new_model's trees."""
+    new = flatten_forest(new_model)
+    n_internal = base.feature.size
+    n_leaves = base.values.shape[0]
+
+    def shift(refs):
+        # Internal refs move past the base's internal nodes, leaf refs past its leaves.
+        refs = refs.astype(np.int32)
+        return np.where(refs >= 0, refs + n_internal, refs - n_leaves).astype(np.int32)
+
+    feature_dtype = np.int16 if base.n_features_in_ <= np.iinfo(np.int16).max else np.int32
+    arrays = {
+        'feature': np.concatenate([base.feature, new['feature']]).astype(feature_dtype),
+        'threshold': np.concatenate([base.threshold, new['threshold']]),
+        'left': np.concatenate([base.left, shift(new['left'])]),
+        'right': np.concatenate([base.right, shift(new['right'])]),
+        'values': np.concatenate([
+            _widen_values(base.values, base.classes_, n_classes),
+            _widen_values(new['values'], new_model.classes_, n_classes),
+        ]),
+        'roots': np.concatenate([base.roots, shift(new['roots'])]),
+    }
+    # Forests saved before internal node values were recorded stay without them.
+    if base.internal_values is not None:
+        arrays['internal_values'] = np.concatenate([
+            _widen_values(base.internal_values, base.classes_, n_classes),
+            _widen_values(new['internal_values'], new_model.classes_, n_classes),
+        ])
+    return arrays
+
+
+def clean_delta(delta):
+    """Applies train_model.py's cleaning to the new rows."""
+    delta = delta.dropna(subset=FEATURE_COLUMNS + [TARGET_COLUMN]).copy()
+    for col in ['Skills', 'Interest', TARGET_COLUMN]:
+        delta[col] = delta[col].astype(str).str.strip().str.title()
+    return delta
+
+
+class ForestUpdate:
+    """The merged forest and extended vocabularies produced by fit_update."""
+
+    def __init__(self, forest, arrays, le_skills, le_interest, le_career, new_labels):
+        self.forest = forest
+        self.arrays = arrays
+        self.le_skills = le_skills
+        self.le_interest = le_interest
+        self.le_career = le_career
+        self.new_labels = new_labels
+
+    def save(self, model_dir):
+        """Writes the merged forest as model_dir/model.forest and returns the path."""
+        return write_forest(
+            self.arrays, self.forest.n_features_in_, self.forest.feature_importances_, self.forest.classes_,
+            self.le_skills, self.le_interest, self.le_career, model_dir,
+        )
+
+
+def encode_delta(delta, le_skills, le_interest, le_career):
+    """Encodes cleaned rows with (already extended) vocabularies into X and y."""
+    X = np.column_stack([
+        delta['GPA'].to_numpy(dtype=np.float64),
+        le_skills.transform(delta['Skills']),
+        le_interest.transform(delta['Interest']),
+    ])
+    return X, le_career.transform(delta[TARGET_COLUMN])
+
+
+def fit_update(base, le_skills, le_interest, le_career, delta, n_trees=NEW_TREES, random_state=42):
+    """Fits n_trees on the cleaned delta and merges them into the base FlatForest; returns a ForestUpdate."""
+    from sklearn.ensemble import RandomForestClassifier
+    le_skills, new_skills = extend_vocabulary(le_skills, delta['Skills'])
+    le_interest, new_interests = extend_vocabulary(le_interest, delta['Interest'])
+    le_career, new_careers = extend_vocabulary(le_career, delta[TARGET_COLUMN])
+    X, y = encode_delta(delta, le_skills, le_interest, le_career)
+
+    # A different seed per update keeps the new trees from repeating earlier bootstraps.
+    model = RandomForestClassifier(n_estimators=n_trees, random_state=random_state + base.n_estimators)
+    model.fit(X, y)
+
+    n_classes = len(le_career.classes_)
+    arrays = append_trees(base, model, n_classes)
+    n_base = base.n_estimators
+    header = {
+        'n_features': base.n_features_in_,
+        'feature_importances': list(
+            (base.feature_importances_ * n_base + model.feature_importances_ * n_trees) / (n_base + n_trees)
+        ),
+        'classes': list(range(n_classes)),
+    }
+    new_labels = {'skills': new_skills, 'interests': new_interests, 'careers': new_careers}
+    return ForestUpdate(FlatForest(header, arrays), arrays, le_skills, le_interest, le_career, new_labels)
@@ -0,0 +1,189 @@
+"""
+Precomputed prediction lattice for the career model.
+
+The forest only ever sees a small vocabulary of skills and interests, and it
+can only tell two GPAs apart when one of its split thresholds falls between
+them. Every (skill, interest, GPA interval) cell therefore has one fixed
+probability vector, so the top-k careers for the whole input space can be
+computed once after training and answered later with an index lookup instead
+of walking all the trees for every request.
+"""
+import os
+import sys
+import numpy as np
+
+LATTICE_K = 3
+LATTICE_FILE = 'lattice.npy'
+EDGES_FILE = 'lattice_edges.npy'
+GPA_FEATURE = 0
+
+
+def top_k(proba, k=LATTICE_K):
+    """Returns the (indices, probabilities) of the k most likely classes per row, best first."""
+    proba = np.atleast_2d(proba)
+    n_classes = proba.shape[1]
+    k = min(k, n_classes)
+    if k < n_classes:
+        # argpartition finds each row's k-th best score without sorting every
+        # class; scores tied with it are then taken lowest class index first.
+        kth_index = np.argpartition(-proba, k - 1, axis=1)[:, k - 1:k]
+        kth = np.take_along_axis(proba, kth_index, axis=1)
+        above = proba > kth
+        tied = proba == kth
+        tied &= np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)
+        candidates = np.nonzero(above | tied)[1].reshape(-1, k)
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), proba.shape)
+    # A stable sort on the negated scores breaks ties by class index, so the
+    # ranking is reproducible between the live forest and the lattice.
+    scores = np.take_along_axis(proba, candidates, axis=1)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def gpa_edges(model):
+    """Collects the sorted, unique GPA split thresholds used anywhere in the forest."""
+    if not hasattr(model, 'estimators_'):
+        # A FlatForest keeps every tree's internal nodes in shared arrays.
+        return np.unique(model.threshold[model.feature == GPA_FEATURE])
+    thresholds = [tree.tree_.threshold[tree.tree_.feature == GPA_FEATURE] for tree in model.estimators_]
+    return np.unique(np.concatenate(thresholds)) if thresholds else np.empty(0)
+
+
+def gpa_cells(edges, gpa):
+    """Maps GPAs to the interval between forest thresholds that they fall in."""
+    # The trees compare float32(x) <= threshold, so GPAs are rounded the same
+    # way before being placed between the edges.
+    gpa = np.asarray(gpa, dtype=np.float32).astype(np.float64)
+    return np.searchsorted(edges, gpa, side='left')
+
+
+def _representatives(edges):
+    """Picks one float32 GPA inside each interval cut by the edges."""
+    if edges.size == 0:
+        return np.zeros(1, dtype=np.float32)
+    # Cell j holds every GPA in (edges[j-1], edges[j]]; the largest float32
+    # not above edges[j] is always inside it because edges are midpoints
+    # between distinct float32 training values.
+    reps = edges.astype(np.float32)
+    too_high = reps.astype(np.float64) > edges
+    reps[too_high] = np.nextafter(reps[too_high], np.float32(-np.inf))
+    last = np.float32(edges[-1])
+    if last <= edges[-1]:
+        last = np.nextafter(last, np.float32(np.inf))
+    return np.append(reps, last)
+
+
+def cell_profiles(edges, n_skills, n_interests):
+    """One encoded profile per (skill, interest, GPA cell), as (features, grid shape)."""
+    skills, interests, cells = np.meshgrid(
+        np.arange(n_skills), np.arange(n_interests), _representatives(edges), indexing='ij'
+    )
+    return np.column_stack([cells.ravel(), skills.ravel(), interests.ravel()]), skills.shape
+
+
+def build_lattice(model, n_skills, n_interests, k=LATTICE_K):
+    """Evaluates the forest once per (skill, interest, GPA cell) and keeps the top-k careers."""
+    edges = gpa_edges(model)
+    features, shape = cell_profiles(edges, n_skills, n_interests)
+    indices, probs = top_k(model.predict_proba(features), k)
+
+    career_dtype = np.int8 if len(model.classes_) <= np.iinfo(np.int8).max else np.int16
+    table = np.empty(shape, dtype=[('career', career_dtype, (indices.shape[1],)),
+                                          ('prob', np.float32, (indices.shape[1],))])
+    table['career'] = indices.reshape(table.shape + (-1,))
+    table['prob'] = probs.reshape(table.shape + (-1,))
+    return PredictionLattice(table, edges)
+
+
+class PredictionLattice:
+    """Top-k careers and probabilities indexed by (skill code, interest code, GPA cell)."""
+
+    def __init__(self, table, edges):
+        self.table = table
+        self.edges = edges
+
+    @property
+    def k(self):
+        return self.table.dtype['career'].shape[0]
+
+    @property
+    def shape(self):
+        return self.table.shape
+
+    def lookup(self, gpa, skill_encoded, interest_encoded):
+        """Returns the top-k (career codes, probabilities) for one profile or arrays of profiles."""
+        cell = self.table[skill_encoded, interest_encoded, gpa_cells(self.edges, gpa)]
+        return cell['career'].astype(np.intp), cell['prob'].astype(np.float64)
+
+    def save(self, model_dir='model'):
+        os.makedirs(model_dir, exist_ok=True)
+        np.save(os.path.join(model_dir, LATTICE_FILE), self.table)
+        np.save(os.path.join(model_dir, EDGES_FILE), self.edges)
+
+    @classmethod
+    def load(cls, model_dir='model'):
+        """Memory-maps a saved lattice so worker processes share one page-cached copy."""
+        table = np.load(os.path.join(model_dir, LATTICE_FILE), mmap_mode='r')
+        edges = np.load(os.path.join(model_dir, EDGES_FILE))
+        return cls(table, edges)
+
+
+def load_lattice(n_skills, n_interests, model_dir='model'):
+    """Loads the lattice if it exists and matches the encoders, otherwise returns None."""
+    try:
+        lattice = PredictionLattice.load(model_dir)
+    except (FileNotFoundError, ValueError):
+        return None
+    if lattice.shape[:2] != (n_skills, n_interests):
+        return None
+    return lattice
+
+
+def verify_lattice(lattice, model, n_random=20000, seed=0):
+    """
+    Checks lattice answers against the live forest.
+    Probes every threshold, the points just beside it, a 0.01 GPA grid and
+    random GPAs with random (skill, interest) pairs.
+    Returns (rows checked, rows that disagree).
+    """
+    rng = np.random.default_rng(seed)
+    n_skills, n_interests = lattice.shape[:2]
+    edges32 = lattice.edges.astype(np.float32)
+    probes = np.concatenate([
+        edges32,
+        np.nextafter(edges32, np.float32(np.inf)),
+        np.nextafter(edges32, np.float32(-np.inf)),
+        np.round(np.arange(0, 10.01, 0.01), 2).astype(np.float32),
+    ])
+    gpa = np.concatenate([probes, rng.uniform(0.0, 10.0, n_random).astype(np.float32)])
+    skill = rng.integers(0, n_skills, gpa.size)
+    interest = rng.integers(0, n_interests, gpa.size)
+
+    features = np.column_stack([gpa, skill, interest])
+    live_indices, live_probs = top_k(model.predict_proba(features), lattice.k)
+    lat_indices, lat_probs = lattice.lookup(gpa, skill, interest)
+
+    same_rank = (live_indices == lat_indices).all(axis=1)
+    same_prob = np.isclose(live_probs, lat_probs, rtol=0, atol=1e-6).all(axis=1)
+    return gpa.size, int((~(same_rank & same_prob)).sum())
+
+
+if __name__ == "__main__":
+    # Rebuilds the lattice from the saved artifacts without retraining.
+    from joblib import load
+    from forest_artifact import FOREST_FILE, load_forest
+    from model_registry import active_version_dir
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else active_version_dir()[1]
+    if os.path.exists(os.path.join(model_dir, FOREST_FILE)):
+        model, le_skills, le_interest, _ = load_forest(model_dir)
+    else:
+        model = load(os.path.join(model_dir, 'model.pkl'))
+        le_skills = load(os.path.join(model_dir, 'skills_encoder.pkl'))
+        le_interest = load(os.path.join(model_dir, 'interest_encoder.pkl'))
+    lattice = build_lattice(model, len(le_skills.classes_), len(le_interest.classes_))
+    checked, mismatches = verify_lattice(lattice, model)
+    if mismatches:
+        sys.exit(f"Lattice disagrees with the forest on {mismatches} of {checked} profiles; not saved.")
+    lattice.save(model_dir)
+    print(f"Saved a {lattice.shape} lattice to '{model_dir}/' (exact on {checked} probed profiles).")
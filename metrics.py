@@ -0,0 +1,206 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms live in one module-level registry and are
+updated under a per-metric lock, which keeps the hot path to a few
+dictionary operations. stage() times a block of code into the shared
+per-stage histogram. Optional request profiling with cProfile is sampled,
+so it can stay enabled in production at a low rate.
+"""
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def expose(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f'{self.name}{_format_labels(key)} {_format_value(v)}' for key, v in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(_label_key(labels))
+        return state[2] if state else 0
+
+    def expose(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {repr(total)}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {n}')
+        return lines
+
+
+_metrics = []
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def counter(name, documentation):
+    return _register(Counter(name, documentation))
+
+
+def gauge(name, documentation):
+    return _register(Gauge(name, documentation))
+
+
+def histogram(name, documentation, buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, buckets))
+
+
+def render():
+    """Returns every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Shared Metrics ---
+REQUESTS = counter('career_requests_total', 'HTTP requests handled, by endpoint, method and status.')
+REQUEST_SECONDS = histogram('career_request_seconds', 'End-to-end HTTP request latency, by endpoint.')
+STAGE_SECONDS = histogram('career_stage_seconds', 'Time spent in each stage of serving a recommendation.')
+ERRORS = counter('career_errors_total', 'Errors raised while serving, by endpoint and kind.')
+PREDICTIONS = counter('career_predictions_total', 'Profiles scored, by the path that answered them.')
+CACHE_REQUESTS = counter('career_cache_requests_total', 'Cache lookups, by cache and result (hit or miss).')
+MODEL_INFO = gauge('career_model_info', 'The model version currently being served (always 1).')
+MODEL_LOADED = gauge('career_model_loaded_timestamp_seconds', 'Unix time at which the served model was loaded.')
+PROFILES = counter('career_profiles_captured_total', 'Requests captured with cProfile.')
+
+
+@contextmanager
+def stage(name):
+    """Records the duration of the enclosed block under career_stage_seconds{stage=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_model(bundle):
+    MODEL_INFO.clear()
+    MODEL_INFO.set(1, version=bundle.version)
+    MODEL_LOADED.set(bundle.loaded_at)
+
+
+# --- Sampled Profiling ---
+PROFILE_SAMPLE_RATE = float(os.environ.get('CAREER_PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.environ.get('CAREER_PROFILE_DIR', 'profiles')
+
+
+def start_profile(sample_rate=None):
+    """Returns a running cProfile.Profile for a sampled fraction of calls, otherwise None."""
+    rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active on this thread.
+        return None
+    return profiler
+
+
+def finish_profile(profiler, label):
+    """Stops a sampled profile and dumps it as a pstats file under PROFILE_DIR."""
+    profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+    path = os.path.join(PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{safe_label}-{threading.get_ident()}.prof')
+    profiler.dump_stats(path)
+    PROFILES.inc(endpoint=label)
+    return path
@@ -0,0 +1,355 @@
+"""
+Shared model registry for the Flask, Streamlit and CLI front ends.
+
+train_model.py writes each trained model into its own directory under
+model/versions/ and then atomically repoints model/CURRENT at it. The
+registry loads the active version once per process and shares it between
+threads. It re-checks the pointer at most every few seconds; when a new
+version appears it is loaded in the background and swapped in with a single
+reference assignment, so requests already holding the old bundle finish on
+it undisturbed. A model/ directory without CURRENT (the flat layout of
+older checkouts) is served as a single legacy version.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+import numpy as np
+from explanations import as_flat_forest, baseline, explain_rows, leaf_contributions, load_explanations
+from forest_artifact import FOREST_FILE, load_forest
+from forest_compression import load_report
+from lattice import load_lattice, top_k
+from metrics import PREDICTIONS, stage
+from multi_hot import INPUT_GROUPS, load_encoder, split_labels
+from similar_profiles import DEFAULT_NEIGHBORS, TIER_LABELS, load_index
+
+MODEL_DIR = 'model'
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+POLL_INTERVAL = 5.0
+# From about this many rows scikit-learn's compiled traversal outruns the
+# NumPy engine of the flat forest (see benchmark.py --suite batch), so larger
+# batches go to the pickled forest when the version has one.
+SKLEARN_MIN_ROWS = 500
+
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def new_version_dir(model_dir=MODEL_DIR):
+    """Creates and returns (version, path) for a fresh artifact directory."""
+    version = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(model_dir, VERSIONS_DIR, version)
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(model_dir, VERSIONS_DIR, f"{version}-{suffix}")
+    os.makedirs(path)
+    return os.path.basename(path), path
+
+
+def activate_version(version, model_dir=MODEL_DIR):
+    """Atomically points model/CURRENT at a version directory."""
+    tmp_path = os.path.join(model_dir, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+
+def active_version_dir(model_dir=MODEL_DIR):
+    """Returns (version, path) of the active artifacts; version is None for the legacy layout."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None, model_dir
+    return version, os.path.join(model_dir, VERSIONS_DIR, version)
+
+
+def _single_label(value, kind):
+    labels = split_labels(value)
+    if len(labels) != 1:
+        raise ValueError(f"This model takes exactly one {kind}; retrain it with --multi-hot to score several.")
+    return labels[0]
+
+
+def _finite_gpa(gpa):
+    # NaN and infinity parse as floats but would land in the lattice's last GPA cell.
+    gpa = float(gpa)
+    if not math.isfinite(gpa):
+        raise ValueError("GPA must be a number.")
+    return gpa
+
+
+class ModelBundle:
+    """
+    One loaded model version: the forest, its encoders and the prediction lattice.
+    The memory-mapped flat forest is used when the version has one; the
+    pickles are only loaded for versions trained before it existed. Versions
+    trained with --multi-hot carry a MultiHotEncoder and accept several skills
+    and interests per profile; they have no lattice.
+    """
+
+    def __init__(self, version, path):
+        self.version = version or f"legacy-{_content_hash(os.path.join(path, 'model.pkl'))}"
+        self.path = path
+        self._estimator = None
+        self._estimator_lock = threading.Lock()
+        if os.path.exists(os.path.join(path, FOREST_FILE)):
+            self.model, self.le_skills, self.le_interest, self.le_career = load_forest(path)
+        else:
+            # joblib (and scikit-learn with it) is only imported for versions without a flat forest.
+            from joblib import load
+            self.model = load(os.path.join(path, 'model.pkl'))
+            self.le_skills = load(os.path.join(path, 'skills_encoder.pkl'))
+            self.le_interest = load(os.path.join(path, 'interest_encoder.pkl'))
+            self.le_career = load(os.path.join(path, 'career_encoder.pkl'))
+            self._estimator = self.model
+        self.encoder = load_encoder(path)
+        self.multi_valued = self.encoder is not None
+        # Precomputed top-3 table; None falls back to the live forest.
+        self.lattice = None if self.multi_valued else load_lattice(
+            len(self.le_skills.classes_), len(self.le_interest.classes_), path
+        )
+        # Per-input contributions for every lattice cell; other models are explained
+        # live from the forest's node values, when the artifact has them.
+        self.explanations = load_explanations(self.lattice, path)
+        self.explainer = None if self.explanations is not None else as_flat_forest(self.model)
+        # Without either, baseline stays None and the apps show the global importance chart.
+        self.contributions = None
+        self.baseline = None
+        if self.explanations is not None:
+            self.baseline = np.asarray(self.explanations.baseline)
+        elif self.explainer is not None:
+            self.baseline = baseline(self.explainer)
+            groups = self.encoder.feature_groups() if self.encoder is not None else np.arange(len(INPUT_GROUPS))
+            self.contributions = leaf_contributions(self.explainer, groups)
+        # Nearest training profiles ("students like you"); None if built without an index.
+        self.profiles = load_index(path)
+        # How a compressed version was derived from its full forest; None for full models.
+        self.compression = load_report(path)
+        self.skills_list = sorted(self.le_skills.classes_)
+        self.interests_list = sorted(self.le_interest.classes_)
+        self.loaded_at = time.time()
+
+    def input_importances(self):
+        """Feature importances summed per input, in INPUT_GROUPS order (GPA, skill, interest)."""
+        importances = np.asarray(self.model.feature_importances_)
+        if self.encoder is not None:
+            return self.encoder.group_importances(importances)
+        return importances[:len(INPUT_GROUPS)]
+
+    def recommend(self, gpa, skill, interest, k=3):
+        """
+        Returns the top-k (career, probability) pairs for one profile.
+        skill and interest are a label, a delimited string or a list of labels.
+        """
+        gpa = _finite_gpa(gpa)
+        if self.encoder is not None:
+            with stage('encode'):
+                features, errors = self.encoder.transform([gpa], [skill], [interest])
+                if errors[0]:
+                    raise ValueError(errors[0])
+            return self._recommend_features(features, k)
+        with stage('encode'):
+            skill_encoded = self.le_skills.transform([_single_label(skill, 'skill')])[0]
+            interest_encoded = self.le_interest.transform([_single_label(interest, 'interest')])[0]
+        if self.lattice is not None and k <= self.lattice.k:
+            with stage('lattice_lookup'):
+                indices, probs = self.lattice.lookup(gpa, skill_encoded, interest_encoded)
+                indices, probs = indices[:k], probs[:k]
+            PREDICTIONS.inc(path='lattice')
+            return list(zip(self.le_career.inverse_transform(indices), probs))
+        return self._recommend_features(np.array([[gpa, skill_encoded, interest_encoded]]), k)
+
+    def explain(self, gpa, skill, interest, k=3):
+        """
+        Explains the top-k careers of one profile: each probability is split into
+        the forest's baseline plus one contribution per input (GPA, skill, interest).
+        Returns [] for versions saved without internal node values.
+        """
+        gpa = _finite_gpa(gpa)
+        with stage('encode'):
+            if self.encoder is not None:
+                features, errors = self.encoder.transform([gpa], [skill], [interest])
+                if errors[0]:
+                    raise ValueError(errors[0])
+            else:
+                skill_encoded = self.le_skills.transform([_single_label(skill, 'skill')])[0]
+                interest_encoded = self.le_interest.transform([_single_label(interest, 'interest')])[0]
+                features = np.array([[gpa, skill_encoded, interest_encoded]])
+        if self.explanations is not None and k <= self.lattice.k:
+            with stage('explanation_lookup'):
+                careers, probs = self.lattice.lookup(gpa, skill_encoded, interest_encoded)
+                contributions = self.explanations.lookup(gpa, skill_encoded, interest_encoded)
+            return self._explanation(careers[:k], probs[:k], contributions[:k])
+        if self.explainer is None:
+            return []
+        with stage('explain'):
+            careers, probs, contributions = explain_rows(self.explainer, self.contributions, features, k)
+        return self._explanation(careers[0], probs[0], contributions[0])
+
+    def _explanation(self, careers, probs, contributions):
+        return [
+            {
+                'career': str(self.le_career.classes_[career]),
+                'probability': float(prob),
+                'baseline': float(self.baseline[career]),
+                'contributions': {group: float(value) for group, value in zip(INPUT_GROUPS, row)},
+            }
+            for career, prob, row in zip(careers, probs, contributions)
+        ]
+
+    def _label_codes(self, value, kind):
+        vocabulary = self.le_skills if kind == 'skill' else self.le_interest
+        labels = split_labels(value) if self.multi_valued else [_single_label(value, kind)]
+        if not labels:
+            raise ValueError(f"At least one {kind} is required.")
+        return vocabulary.transform(labels)
+
+    def similar(self, gpa, skill, interest, k=DEFAULT_NEIGHBORS):
+        """Returns up to k real training profiles closest to this one, best match first."""
+        if self.profiles is None:
+            return []
+        gpa = _finite_gpa(gpa)
+        with stage('similar_profiles'):
+            rows, tiers, _ = self.profiles.query(
+                gpa, self._label_codes(skill, 'skill'), self._label_codes(interest, 'interest'), k
+            )
+            neighbors = []
+            for row, tier in zip(rows, tiers):
+                row_gpa, skills, interests, career = self.profiles.profile(row)
+                neighbors.append({
+                    'gpa': round(row_gpa, 2),
+                    'skills': [str(s) for s in self.le_skills.classes_[skills]],
+                    'interests': [str(i) for i in self.le_interest.classes_[interests]],
+                    'career': str(self.le_career.classes_[career]),
+                    'match': TIER_LABELS[tier],
+                })
+        return neighbors
+
+    def predict_proba(self, features):
+        """
+        Career probabilities per row: from the flat forest for small batches, and
+        from the identical pickled forest for large ones when the version has it.
+        """
+        if features.shape[0] >= SKLEARN_MIN_ROWS:
+            estimator = self._sklearn_estimator()
+            if estimator is not None:
+                return estimator.predict_proba(features)
+        return self.model.predict_proba(features)
+
+    def _sklearn_estimator(self):
+        # Unpickled on the first large batch only, so a cold start still skips it.
+        if self._estimator is None:
+            with self._estimator_lock:
+                if self._estimator is None:
+                    pickle_path = os.path.join(self.path, 'model.pkl')
+                    if os.path.exists(pickle_path):
+                        from joblib import load
+                        self._estimator = load(pickle_path)
+                    else:
+                        # Compressed versions exist only as flat arrays.
+                        self._estimator = False
+        return self._estimator if self._estimator is not False else None
+
+    def _recommend_features(self, features, k):
+        with stage('predict_proba'):
+            proba = self.predict_proba(features)
+        with stage('top_k'):
+            indices, probs = top_k(proba, k)
+        PREDICTIONS.inc(path='forest')
+        return list(zip(self.le_career.inverse_transform(indices[0]), probs[0]))
+
+    def info(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.loaded_at)),
+            'lattice': self.lattice is not None,
+            'flat_forest': os.path.exists(os.path.join(self.path, FOREST_FILE)),
+            'multi_hot': self.multi_valued,
+            'profile_index': self.profiles is not None,
+            'explanations': 'precomputed' if self.explanations is not None else ('live' if self.explainer is not None else None),
+            'compression': None if self.compression is None else {
+                key: self.compression['chosen'][key] for key in ('kind', 'trees', 'max_depth')
+            } | {
+                'accuracy_change': self.compression['chosen']['test']['accuracy_change'],
+                'parent': self.compression['parent'],
+            },
+        }
+
+
+class ModelRegistry:
+    """Process-wide holder of the active ModelBundle with background hot-reload."""
+
+    def __init__(self, model_dir=MODEL_DIR, poll_interval=POLL_INTERVAL):
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self._bundle = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._loading = None
+
+    def current(self):
+        """Returns the active bundle; callers should hold on to it for a whole request."""
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    version, path = active_version_dir(self.model_dir)
+                    self._bundle = ModelBundle(version, path)
+                    self._checked_at = time.monotonic()
+                return self._bundle
+        if time.monotonic() - self._checked_at >= self.poll_interval:
+            self._check_for_update()
+        return bundle
+
+    def _check_for_update(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version, path = active_version_dir(self.model_dir)
+            if version is None or version == self._bundle.version or self._loading == version:
+                return
+            self._loading = version
+        threading.Thread(target=self._load, args=(version, path), daemon=True).start()
+
+    def _load(self, version, path):
+        try:
+            bundle = ModelBundle(version, path)
+        except Exception:
+            # A half-written or broken version keeps the old model serving; the
+            # next poll retries it.
+            bundle = None
+        with self._lock:
+            if bundle is not None:
+                self._bundle = bundle
+            self._loading = None
+
+    def reload(self):
+        """Synchronously loads whatever version is active now."""
+        version, path = active_version_dir(self.model_dir)
+        bundle = ModelBundle(version, path)
+        with self._lock:
+            self._bundle = bundle
+            self._checked_at = time.monotonic()
+        return bundle
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(model_dir=MODEL_DIR):
+    """Returns the process-wide registry, creating it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(model_dir)
+        return _registry
@@ -0,0 +1,157 @@
+"""
+Parallel, resumable hyperparameter search for the career forest.
+
+Every (parameter set, fold) pair is an independent job on a process pool.
+The encoded dataset is written once to .npy files that every worker
+memory-maps, so folds are shared through the page cache instead of being
+pickled to each process. Each finished job is saved to a cache directory
+keyed by the data and the job, so an interrupted search picks up where it
+stopped. Besides accuracy, every job measures fit time, single-profile
+predict latency and pickled model size, so candidates can be compared on
+serving cost as well as quality.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+SEARCH_CACHE_DIR = os.path.join('model', 'search_cache')
+PARAM_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 6, 10, 16],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', None],
+}
+LATENCY_REPEATS = 50
+RANDOM_STATE = 42
+
+
+def _job_key(data_hash, params, fold, n_folds):
+    payload = json.dumps([data_hash, params, fold, n_folds, RANDOM_STATE], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+def _share_dataset(X, y, cache_dir):
+    """Writes X and y once as .npy files for the workers to memory-map; returns their hash."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.int64)
+    data_hash = hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest()[:16]
+    data_dir = os.path.join(cache_dir, data_hash)
+    os.makedirs(data_dir, exist_ok=True)
+    for name, array in (('X.npy', X), ('y.npy', y)):
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            np.save(path + '.tmp.npy', array)
+            os.replace(path + '.tmp.npy', path)
+    return data_hash, data_dir
+
+
+def evaluate_fold(data_dir, params, train_idx, test_idx):
+    """Fits one candidate on one fold and measures quality and serving cost."""
+    from sklearn.ensemble import RandomForestClassifier
+    X = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    accuracy = float((model.predict(X_test) == y_test).mean())
+
+    single = X_test[:1]
+    latencies = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict_proba(single)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'accuracy': accuracy,
+        'fit_time_s': fit_time,
+        'predict_latency_ms': float(np.median(latencies) * 1000),
+        'model_size_kb': len(pickle.dumps(model)) / 1024,
+        'n_nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+    }
+
+
+def _run_job(data_dir, result_path, params, train_idx, test_idx):
+    result = evaluate_fold(data_dir, params, train_idx, test_idx)
+    tmp_path = result_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp_path, result_path)
+    return result
+
+
+def candidate_params(n_iter=None, grid=PARAM_GRID):
+    """The full grid, or n_iter reproducibly sampled points of it for a random search."""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+    if n_iter:
+        return list(ParameterSampler(grid, n_iter=n_iter, random_state=RANDOM_STATE))
+    return list(ParameterGrid(grid))
+
+
+def run_search(X, y, n_folds=5, n_iter=None, n_jobs=None, cache_dir=SEARCH_CACHE_DIR, on_result=None):
+    """
+    Cross-validates every candidate with stratified k-fold on a process pool.
+    Returns one summary dict per candidate, best mean accuracy first.
+    on_result(done, total) is called as jobs finish, including cached ones.
+    """
+    from sklearn.model_selection import StratifiedKFold
+    data_hash, data_dir = _share_dataset(X, y, cache_dir)
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+    candidates = candidate_params(n_iter)
+
+    results = {}
+    pending = []
+    for c, params in enumerate(candidates):
+        for fold, (train_idx, test_idx) in enumerate(folds):
+            result_path = os.path.join(data_dir, _job_key(data_hash, params, fold, n_folds) + '.json')
+            if os.path.exists(result_path):
+                with open(result_path) as f:
+                    results[c, fold] = json.load(f)
+            else:
+                pending.append((c, fold, result_path, params, train_idx, test_idx))
+
+    total = len(candidates) * n_folds
+    if on_result:
+        on_result(len(results), total)
+    if pending:
+        with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+            futures = {
+                pool.submit(_run_job, data_dir, result_path, params, train_idx, test_idx): (c, fold)
+                for c, fold, result_path, params, train_idx, test_idx in pending
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_result:
+                    on_result(len(results), total)
+
+    summaries = []
+    for c, params in enumerate(candidates):
+        fold_results = [results[c, fold] for fold in range(n_folds)]
+        accuracies = [r['accuracy'] for r in fold_results]
+        summaries.append({
+            'params': params,
+            'accuracy_mean': float(np.mean(accuracies)),
+            'accuracy_std': float(np.std(accuracies)),
+            'fit_time_s': float(np.mean([r['fit_time_s'] for r in fold_results])),
+            'predict_latency_ms': float(np.mean([r['predict_latency_ms'] for r in fold_results])),
+            'model_size_kb': float(np.mean([r['model_size_kb'] for r in fold_results])),
+            'n_nodes': float(np.mean([r['n_nodes'] for r in fold_results])),
+        })
+    summaries.sort(key=lambda s: (-s['accuracy_mean'], s['predict_latency_ms']))
+    return summaries
+
+
+def cheapest_within(summaries, tolerance=0.01):
+    """The lowest-latency candidate whose mean accuracy is within tolerance of the best."""
+    best = summaries[0]['accuracy_mean']
+    close = [s for s in summaries if s['accuracy_mean'] >= best - tolerance]
+    return min(close, key=lambda s: (s['predict_latency_ms'], s['model_size_kb']))
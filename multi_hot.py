@@ -0,0 +1,131 @@
+"""
+Multi-hot encoding of profiles with several skills and interests.
+
+A profile is a GPA plus any number of skills and interests. Instead of one
+ordinal code per column, every known skill and every known interest gets its
+own binary column, so the matrix is
+
+    [GPA | one column per skill | one column per interest]
+
+and is built directly in SciPy CSR format. A row stores only its GPA and the
+labels it actually has, so memory and encoding time depend on how many
+labels a profile lists, not on how large the vocabularies grow. Training and
+prediction consume the CSR matrix as is; it is never densified.
+
+In the dataset and in form or CSV input, several labels go in one field
+separated by commas, semicolons or pipes ("Python; Sql").
+"""
+import json
+import os
+import re
+import numpy as np
+
+ENCODER_FILE = 'multi_hot.json'
+LABEL_SEPARATORS = re.compile(r'[,;|]')
+INPUT_GROUPS = ['GPA', 'Skill', 'Interest']
+
+
+def split_labels(value):
+    """
+    Normalizes one field into a sorted tuple of distinct, title-cased labels.
+    Accepts a delimited string or any iterable of strings.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ()
+    parts = LABEL_SEPARATORS.split(value) if isinstance(value, str) else [str(v) for v in value]
+    return tuple(sorted({part.strip().title() for part in parts if part.strip()}))
+
+
+class MultiHotEncoder:
+    """Maps (GPA, skills, interests) profiles to CSR rows over a fixed vocabulary."""
+
+    def __init__(self, skills, interests):
+        self.skills = list(skills)
+        self.interests = list(interests)
+        self._skill_columns = {label: 1 + i for i, label in enumerate(self.skills)}
+        self._interest_columns = {label: 1 + len(self.skills) + i for i, label in enumerate(self.interests)}
+        self.n_features = 1 + len(self.skills) + len(self.interests)
+
+    @classmethod
+    def fit(cls, skill_values, interest_values):
+        """Builds the vocabularies from every label seen in the training fields."""
+        skills = set()
+        interests = set()
+        for value in skill_values:
+            skills.update(split_labels(value))
+        for value in interest_values:
+            interests.update(split_labels(value))
+        return cls(sorted(skills), sorted(interests))
+
+    @property
+    def feature_names(self):
+        return ['GPA'] + [f'Skill: {s}' for s in self.skills] + [f'Interest: {i}' for i in self.interests]
+
+    def feature_groups(self):
+        """Index of the input (0 GPA, 1 skill, 2 interest) each column belongs to."""
+        return np.repeat([0, 1, 2], [1, len(self.skills), len(self.interests)])
+
+    def group_importances(self, importances):
+        """Sums per-column importances into one value per input, in INPUT_GROUPS order."""
+        return np.bincount(self.feature_groups(), weights=importances, minlength=len(INPUT_GROUPS))
+
+    def transform(self, gpa, skill_values, interest_values):
+        """
+        Encodes profiles into a float32 CSR matrix.
+        Returns (matrix, errors) where errors[i] is None or a message for a row
+        with an unknown or missing label; such rows are encoded without it.
+        """
+        gpa = np.asarray(gpa, dtype=np.float32).reshape(-1)
+        n_rows = gpa.size
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        indices = []
+        errors = [None] * n_rows
+        for row, (skill_value, interest_value) in enumerate(zip(skill_values, interest_values)):
+            skills = split_labels(skill_value)
+            interests = split_labels(interest_value)
+            columns = [0]
+            for kind, labels, lookup in (('skill', skills, self._skill_columns),
+                                         ('interest', interests, self._interest_columns)):
+                if not labels:
+                    errors[row] = errors[row] or f"At least one {kind} is required."
+                for label in labels:
+                    column = lookup.get(label)
+                    if column is None:
+                        errors[row] = errors[row] or f"Unknown {kind} '{label}'."
+                    else:
+                        columns.append(column)
+            indices.extend(sorted(columns))
+            indptr[row + 1] = len(indices)
+
+        from scipy import sparse
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.ones(indices.size, dtype=np.float32)
+        data[indptr[:-1]] = gpa
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(n_rows, self.n_features))
+        return matrix, errors
+
+    def save(self, model_dir):
+        with open(os.path.join(model_dir, ENCODER_FILE), 'w') as f:
+            json.dump({'skills': self.skills, 'interests': self.interests}, f)
+
+
+def load_encoder(model_dir):
+    """Returns the version's MultiHotEncoder, or None for models trained on ordinal codes."""
+    try:
+        with open(os.path.join(model_dir, ENCODER_FILE)) as f:
+            vocabularies = json.load(f)
+    except FileNotFoundError:
+        return None
+    return MultiHotEncoder(vocabularies['skills'], vocabularies['interests'])
+
+
+def probe_matrix(encoder, n=20000, max_labels=4, seed=0):
+    """Random multi-hot profiles covering the vocabularies, as a CSR matrix."""
+    rng = np.random.default_rng(seed)
+    skills = np.array(encoder.skills, dtype=object)
+    interests = np.array(encoder.interests, dtype=object)
+    skill_sets = [rng.choice(skills, rng.integers(1, min(max_labels, skills.size) + 1), replace=False)
+                  for _ in range(n)]
+    interest_sets = [rng.choice(interests, rng.integers(1, min(max_labels, interests.size) + 1), replace=False)
+                     for _ in range(n)]
+    return encoder.transform(rng.uniform(0.0, 10.0, n), skill_sets, interest_sets)[0]
@@ -1,33 +1,70 @@
 import streamlit as st
-from joblib import load
-import numpy as np
-import os
 import pandas as pd
 import plotly.express as px
+from model_registry import get_registry
+import result_cache
 
 st.set_page_config(page_title="Career Recommender", layout="wide")
 
 # --- Load Models ---
 @st.cache_resource
 def load_models():
-    """Loads the trained model and encoders from disk."""
-    model = load(os.path.join('model', 'model.pkl'))
-    le_skills = load(os.path.join('model', 'skills_encoder.pkl'))
-    le_interest = load(os.path.join('model', 'interest_encoder.pkl'))
-    le_career = load(os.path.join('model', 'career_encoder.pkl'))
-    return model, le_skills, le_interest, le_career
+    """Returns the shared model registry; it hot-reloads newly trained versions."""
+    return get_registry()
 
-model, le_skills, le_interest, le_career = load_models()
-skills_options = sorted(le_skills.classes_)
-interests_options = sorted(le_interest.classes_)
+@st.cache_resource
+def importance_figure(version, feature_importances):
+    """Builds the feature-importance chart once per model version."""
+    importance_df = pd.DataFrame({
+        'Feature': ['GPA', 'Skill', 'Interest'],
+        'Importance': feature_importances
+    }).sort_values(by='Importance', ascending=False)
+
+    fig = px.bar(
+        importance_df, 
+        x='Importance', 
+        y='Feature', 
+        orientation='h',
+        text=importance_df['Importance'].apply(lambda x: f'{x:.2f}'),
+        title="Feature Importance"
+    )
+    fig.update_layout(yaxis_title="Your Inputs", xaxis_title="Influence on Prediction")
+    return fig
+
+# Keyed on one profile's contributions, so the cache is bounded.
+@st.cache_resource(max_entries=256)
+def contribution_figure(career, contributions):
+    """Builds the chart of how each input moved one profile's top career, once per distinct explanation."""
+    contribution_df = pd.DataFrame(contributions, columns=['Input', 'Contribution'])
+    contribution_df['Contribution'] *= 100
+    fig = px.bar(
+        contribution_df,
+        x='Contribution',
+        y='Input',
+        orientation='h',
+        color=contribution_df['Contribution'] >= 0,
+        color_discrete_map={True: '#0ea5e9', False: '#f87171'},
+        text=contribution_df['Contribution'].apply(lambda x: f'{x:+.1f}'),
+        title=f"Why {career}?"
+    )
+    fig.update_layout(yaxis_title="Your Inputs", xaxis_title="Change in Confidence (percentage points)", showlegend=False)
+    return fig
+
+bundle = load_models().current()
+skills_options = bundle.skills_list
+interests_options = bundle.interests_list
 
 # --- Sidebar for User Inputs ---
 with st.sidebar:
     st.header("👤 Your Profile")
     st.markdown("Tell us about yourself.")
     gpa = st.slider("Select your GPA:", min_value=0.0, max_value=10.0, value=7.5, step=0.1)
-    skill = st.selectbox("Select your Top Skill:", skills_options)
-    interest = st.selectbox("Select your Primary Interest:", interests_options)
+    if bundle.multi_valued:
+        skill = st.multiselect("Select your Skills:", skills_options, default=skills_options[:1])
+        interest = st.multiselect("Select your Interests:", interests_options, default=interests_options[:1])
+    else:
+        skill = st.selectbox("Select your Top Skill:", skills_options)
+        interest = st.selectbox("Select your Primary Interest:", interests_options)
     st.markdown("---")
     predict_button = st.button("Recommend Career", type="primary", use_container_width=True)
 
@@ -42,17 +79,12 @@ if predict_button:
     else:
         # Existing prediction logic
         try:
-            skill_encoded = le_skills.transform([skill])[0]
-            interest_encoded = le_interest.transform([interest])[0]
-            features = np.array([[gpa, skill_encoded, interest_encoded]])
-            
-            pred_probabilities = model.predict_proba(features)[0]
-            
+            predictions = result_cache.recommend(result_cache.get_result_cache(), bundle, gpa, skill, interest)
+
             st.header("✨ Your Personalized Recommendation")
 
-            top_3_indices = np.argsort(pred_probabilities)[-3:][::-1]
-            top_3_careers = le_career.inverse_transform(top_3_indices)
-            top_3_probs = pred_probabilities[top_3_indices]
+            top_3_careers = [career for career, _ in predictions]
+            top_3_probs = [prob for _, prob in predictions]
 
             st.success(f"### 🎯 Top Recommendation: **{top_3_careers[0]}**")
             st.write(f"Confidence Score: **{top_3_probs[0]:.2%}**")
@@ -61,25 +93,29 @@ if predict_button:
             for i in range(1, len(top_3_careers)):
                 st.write(f"{i+1}. **{top_3_careers[i]}** (Confidence: {top_3_probs[i]:.2%})")
 
+            similar = bundle.similar(gpa, skill, interest)
+            if similar:
+                st.subheader("👥 Students Like You")
+                st.write("Real profiles from the training data closest to yours.")
+                similar_df = pd.DataFrame(similar)
+                for col in ['skills', 'interests']:
+                    similar_df[col] = similar_df[col].str.join(", ")
+                similar_df.columns = ['GPA', 'Skills', 'Interests', 'Career', 'Match']
+                st.dataframe(similar_df, hide_index=True, use_container_width=True)
+
             st.markdown("---")
             st.subheader("💡 Why This Recommendation?")
-            st.write("This chart shows how much each of your inputs influenced the model's decision.")
-
-            feature_importances = model.feature_importances_
-            importance_df = pd.DataFrame({
-                'Feature': ['GPA', 'Skill', 'Interest'],
-                'Importance': feature_importances
-            }).sort_values(by='Importance', ascending=False)
-            
-            fig = px.bar(
-                importance_df, 
-                x='Importance', 
-                y='Feature', 
-                orientation='h',
-                text=importance_df['Importance'].apply(lambda x: f'{x:.2f}'),
-                title="Feature Importance"
-            )
-            fig.update_layout(yaxis_title="Your Inputs", xaxis_title="Influence on Prediction")
+            explanation = bundle.explain(gpa, skill, interest, k=1)
+            if explanation:
+                top = explanation[0]
+                st.write(
+                    f"Before looking at your profile the model gives **{top['career']}** "
+                    f"{top['baseline']:.2%}. This chart shows how much each of your inputs moved that up or down."
+                )
+                fig = contribution_figure(top['career'], tuple(top['contributions'].items()))
+            else:
+                st.write("This chart shows how much each of your inputs influenced the model's decision.")
+                fig = importance_figure(bundle.version, tuple(bundle.input_importances()))
             st.plotly_chart(fig, use_container_width=True)
 
         except Exception as e:
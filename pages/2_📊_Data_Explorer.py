@@ -1,57 +1,97 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+from dataset_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DatasetService
 
 st.set_page_config(page_title="Data Explorer", layout="wide")
 
 st.title("📊 Data Explorer")
 st.write("Explore the dataset used to train the recommendation model.")
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    """Loads the career dataset."""
-    df = pd.read_csv('dataset/career_data.csv')
-    return df
+    """Returns the shared dataset service; it reloads the CSV only when its content changes."""
+    return DatasetService()
 
-df = load_data()
-
-st.markdown("### 📈 Visualizations")
-chart_type = st.selectbox(
-    "Choose a chart to display:",
-    ["Distribution of Recommended Careers", "GPA Distribution by Interest", "Skills by Interest"]
-)
-
-if chart_type == "Distribution of Recommended Careers":
-    career_counts = df['Recommended_Career'].value_counts().reset_index()
-    career_counts.columns = ['Career', 'Count']
-    fig = px.bar(
-        career_counts, 
-        x='Count', 
-        y='Career', 
-        orientation='h', 
+# Charts are built from the snapshot's precomputed aggregates, once per dataset version.
+@st.cache_resource
+def career_counts_figure(fingerprint, _snapshot):
+    career_counts = _snapshot.career_counts.rename_axis('Career').reset_index(name='Count')
+    return px.bar(
+        career_counts,
+        x='Count',
+        y='Career',
+        orientation='h',
         title='Number of Profiles per Career',
         text='Count'
     )
-    st.plotly_chart(fig, use_container_width=True)
-
-elif chart_type == "GPA Distribution by Interest":
-    fig = px.box(
-        df, 
-        x='Interest', 
-        y='GPA', 
-        title='GPA Distribution across different Interests'
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-elif chart_type == "Skills by Interest":
-    skills_by_interest = df.groupby('Interest')['Skills'].nunique().reset_index()
-    fig = px.pie(
-        skills_by_interest, 
-        names='Interest', 
-        values='Skills', 
+
+@st.cache_resource
+def gpa_box_figure(fingerprint, _snapshot):
+    stats = _snapshot.gpa_by_interest
+    # Boxes are drawn from the quartiles and whiskers; no raw rows go to the browser.
+    fig = go.Figure(go.Box(
+        x=[str(interest) for interest in stats.index],
+        q1=stats['q1'],
+        median=stats['median'],
+        q3=stats['q3'],
+        lowerfence=stats['lower_fence'],
+        upperfence=stats['upper_fence'],
+        mean=stats['mean'],
+        name='GPA',
+    ))
+    fig.update_layout(title='GPA Distribution across different Interests', xaxis_title='Interest', yaxis_title='GPA')
+    return fig
+
+@st.cache_resource
+def skills_by_interest_figure(fingerprint, _snapshot):
+    skills_by_interest = _snapshot.unique_skills_by_interest().rename_axis('Interest').reset_index(name='Skills')
+    return px.pie(
+        skills_by_interest,
+        names='Interest',
+        values='Skills',
         title='Number of Unique Skills per Interest Area'
     )
-    st.plotly_chart(fig, use_container_width=True)
 
+@st.cache_resource
+def skill_interest_figure(fingerprint, _snapshot):
+    crosstab = _snapshot.skills_by_interest
+    crosstab = crosstab.loc[crosstab.sum(axis=1) > 0, crosstab.sum(axis=0) > 0]
+    fig = px.imshow(crosstab, aspect='auto', color_continuous_scale='Blues', title='Profiles per Skill and Interest')
+    fig.update_layout(xaxis_title='Interest', yaxis_title='Skill')
+    return fig
+
+CHARTS = {
+    "Distribution of Recommended Careers": career_counts_figure,
+    "GPA Distribution by Interest": gpa_box_figure,
+    "Skills by Interest": skills_by_interest_figure,
+    "Skill and Interest Cross-Tab": skill_interest_figure,
+}
+
+snapshot = load_data().get()
+
+st.markdown("### 📈 Visualizations")
+chart_type = st.selectbox("Choose a chart to display:", list(CHARTS))
+st.plotly_chart(CHARTS[chart_type](snapshot.fingerprint, snapshot), use_container_width=True)
+
+# --- Raw Dataset, one page at a time ---
 st.markdown("### Raw Dataset")
-st.dataframe(df)
\ No newline at end of file
+controls = st.columns([2, 2, 1, 1])
+query = controls[0].text_input("Search:")
+sort = controls[1].selectbox("Sort by:", ["(file order)"] + snapshot.columns)
+descending = controls[2].checkbox("Descending")
+per_page = controls[3].selectbox("Rows per page:", sorted({DEFAULT_PAGE_SIZE, 100, MAX_PAGE_SIZE}))
+
+total = snapshot.page(per_page=1, query=query)['total'] if query else len(snapshot.df)
+n_pages = max(1, -(-total // per_page))
+page = st.number_input(f"Page (of {n_pages:,}):", min_value=1, max_value=n_pages, value=1)
+result = snapshot.page(
+    page=page,
+    per_page=per_page,
+    sort=None if sort == "(file order)" else sort,
+    descending=descending,
+    query=query,
+)
+st.dataframe(pd.DataFrame(result['rows'], columns=result['columns']), hide_index=True, use_container_width=True)
+st.caption(f"{total:,} matching rows of {len(snapshot.df):,}.")
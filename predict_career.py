@@ -1,32 +1,47 @@
-import time
-import os
-from joblib import load
-import numpy as np
+"""
+Career recommender CLI.
 
-# Third-party libraries for a better CLI experience
-import questionary
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
-import pyfiglet
+Without arguments it asks for one profile interactively. With --input it runs
+headless and bulk-scores a CSV, JSON Lines or Parquet file, or stdin:
 
-# Initialize Rich Console for beautiful printing
-console = Console()
+    python predict_career.py --input students.csv --output predictions.csv
+    cat students.csv | python predict_career.py --input - > predictions.csv
+
+The interactive UI libraries (rich, questionary, pyfiglet) are only imported
+when the interactive mode runs, so batch jobs start quickly.
+"""
+import argparse
+import sys
+
+console = None
+
+
+def _init_ui():
+    """Imports the interactive UI libraries and creates the Rich console on first use."""
+    global console, questionary, Panel, Progress, SpinnerColumn, TextColumn, Table, pyfiglet
+    if console is not None:
+        return
+    # Third-party libraries for a better CLI experience
+    import questionary
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.table import Table
+    import pyfiglet
+    # Initialize Rich Console for beautiful printing
+    console = Console()
 
 
 def load_resources():
-    """Loads and returns the model and encoders."""
-    model = load(os.path.join("model", "model.pkl"))
-    le_skills = load(os.path.join("model", "skills_encoder.pkl"))
-    le_interest = load(os.path.join("model", "interest_encoder.pkl"))
-    le_career = load(os.path.join("model", "career_encoder.pkl"))
-    return model, le_skills, le_interest, le_career
+    """Loads and returns the active model bundle (model, encoders and lattice)."""
+    from model_registry import get_registry
+    return get_registry().current()
 
 
-def get_user_input(skills_options, interests_options):
+def get_user_input(skills_options, interests_options, multi_select=False):
     """
     Prompts the user for input using interactive menus.
+    Multi-hot models let the user tick several skills and interests.
     """
     console.print(Panel.fit("[bold cyan]👤 Please provide your details[/bold cyan]"))
 
@@ -38,15 +53,28 @@ def get_user_input(skills_options, interests_options):
     ).ask()
 
     # Using select for skills and interests prevents typos and validation issues
-    skill = questionary.select(
-        "What is your top skill?",
-        choices=skills_options
-    ).ask()
-
-    interest = questionary.select(
-        "What is your primary interest?",
-        choices=interests_options
-    ).ask()
+    if multi_select:
+        skill = questionary.checkbox(
+            "Which skills do you have?",
+            choices=skills_options,
+            validate=lambda picked: True if picked else "Pick at least one skill"
+        ).ask()
+
+        interest = questionary.checkbox(
+            "What are your interests?",
+            choices=interests_options,
+            validate=lambda picked: True if picked else "Pick at least one interest"
+        ).ask()
+    else:
+        skill = questionary.select(
+            "What is your top skill?",
+            choices=skills_options
+        ).ask()
+
+        interest = questionary.select(
+            "What is your primary interest?",
+            choices=interests_options
+        ).ask()
     
     if gpa is None or skill is None or interest is None:
         console.print("[bold red]Input cancelled. Exiting.[/bold red]")
@@ -55,6 +83,24 @@ def get_user_input(skills_options, interests_options):
     return float(gpa), skill, interest
 
 
+def display_similar(similar):
+    """Displays the closest training profiles ("students like you") in a table."""
+    if not similar:
+        return
+    table = Table(title="👥 Students Like You", title_style="bold cyan")
+    table.add_column("GPA", justify="right")
+    table.add_column("Skills")
+    table.add_column("Interests")
+    table.add_column("Career", style="magenta")
+    table.add_column("Match", style="dim")
+    for profile in similar:
+        table.add_row(
+            f"{profile['gpa']:.2f}", ", ".join(profile['skills']), ", ".join(profile['interests']),
+            profile['career'], profile['match'],
+        )
+    console.print(table)
+
+
 def display_results(gpa, skill, interest, career):
     """Displays the prediction result in a formatted panel."""
     
@@ -63,8 +109,8 @@ def display_results(gpa, skill, interest, career):
     input_table.add_column(style="dim")
     input_table.add_column(style="bold")
     input_table.add_row("GPA", f"{gpa:.2f}")
-    input_table.add_row("Top Skill", skill)
-    input_table.add_row("Primary Interest", interest)
+    input_table.add_row("Skills" if isinstance(skill, list) else "Top Skill", ", ".join(skill) if isinstance(skill, list) else skill)
+    input_table.add_row("Interests" if isinstance(interest, list) else "Primary Interest", ", ".join(interest) if isinstance(interest, list) else interest)
 
     # Create the main results panel
     results_panel = Panel(
@@ -83,6 +129,7 @@ def display_results(gpa, skill, interest, career):
 
 def main():
     """Main function to run the application."""
+    _init_ui()
     try:
         # --- Welcome Banner ---
         banner = pyfiglet.figlet_format("Career AI", font="slant")
@@ -90,12 +137,12 @@ def main():
         console.print(Panel.fit("Welcome to the AI Career Recommender System!", border_style="blue"))
 
         # --- Load Resources ---
-        model, le_skills, le_interest, le_career = load_resources()
-        skills_options = sorted(le_skills.classes_)
-        interests_options = sorted(le_interest.classes_)
+        bundle = load_resources()
+        skills_options = bundle.skills_list
+        interests_options = bundle.interests_list
 
         # --- Get User Input ---
-        gpa, skill, interest = get_user_input(skills_options, interests_options)
+        gpa, skill, interest = get_user_input(skills_options, interests_options, bundle.multi_valued)
 
         # --- Predict ---
         with Progress(
@@ -104,15 +151,12 @@ def main():
             transient=True,
         ) as progress:
             progress.add_task(description="Analyzing your profile...", total=None)
-            skill_encoded = le_skills.transform([skill])[0]
-            interest_encoded = le_interest.transform([interest])[0]
-            features = np.array([[gpa, skill_encoded, interest_encoded]])
-            prediction_encoded = model.predict(features)
-            recommended_career = le_career.inverse_transform(prediction_encoded)[0]
-            time.sleep(1) # Simulate processing time
+            recommended_career = bundle.recommend(gpa, skill, interest, k=1)[0][0]
+            similar = bundle.similar(gpa, skill, interest)
 
         # --- Display Results ---
         display_results(gpa, skill, interest, recommended_career)
+        display_similar(similar)
 
     except (KeyboardInterrupt, TypeError):
         console.print("\n[bold red]✖️ Program interrupted by user. Exiting.[/bold red]")
@@ -120,5 +164,58 @@ def main():
         console.print(f"\n[bold red]An unexpected error occurred: {e}[/bold red]")
 
 
+def run_batch(args):
+    """Headless mode: scores every profile of args.input and streams the predictions out."""
+    from bulk_scoring import infer_format, score_file
+    output_format = args.output_format or infer_format(args.output, default='csv')
+    if output_format == 'parquet':
+        sys.exit("Error: predictions are written as CSV or JSON Lines, not Parquet.")
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        summary = score_file(
+            args.input, output, k=args.top, input_format=args.input_format, output_format=output_format,
+            chunk_size=args.chunk_size, jobs=args.jobs,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    rate = summary['rows'] / summary['seconds'] if summary['seconds'] else 0.0
+    print(
+        f"Scored {summary['rows']} profiles ({summary['errors']} with errors) with model version "
+        f"{summary['version'] or 'legacy'} on {summary['workers']} worker(s) in {summary['seconds']:.2f}s "
+        f"({rate:,.0f} profiles/s).",
+        file=sys.stderr,
+    )
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args(argv=None):
+    from bulk_scoring import BULK_CHUNK_SIZE, INPUT_FORMATS, OUTPUT_FORMATS
+    parser = argparse.ArgumentParser(description="Recommend careers interactively, or bulk-score profiles with --input.")
+    parser.add_argument("--input", help="CSV, JSON Lines or Parquet file of profiles (gpa, skill, interest, optional id); '-' reads CSV from stdin")
+    parser.add_argument("--output", default="-", help="where to write predictions (default: stdout)")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, help="input format (default: from the file extension, CSV for stdin)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, help="output format (default: from the file extension, CSV for stdout)")
+    parser.add_argument("--top", type=positive_int, default=3, help="careers per profile (default: 3)")
+    parser.add_argument("--chunk-size", type=positive_int, default=BULK_CHUNK_SIZE, help=f"profiles per chunk (default: {BULK_CHUNK_SIZE})")
+    parser.add_argument("--jobs", type=positive_int, default=None, help="worker processes for inputs larger than one chunk (default: all cores)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        args = parse_args()
+        if args.input is None:
+            sys.exit("Error: --input is required for batch scoring; run without arguments for the interactive mode.")
+        run_batch(args)
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Cache of recommendation results keyed on the normalized profile.
+
+Traffic repeats the same (GPA, skill, interest) profiles constantly, so the
+top-k careers for a profile are cached under a key that also carries the
+model version; a retrained model never serves stale results and old entries
+simply age out. Each process keeps a bounded LRU with a TTL. When
+CAREER_CACHE_URL points at a Redis server, that is used as a second level
+shared by every worker, so a profile scored by one gunicorn worker is a hit
+for all of them. A shared backend that is down only costs cache hits, never
+requests.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from metrics import CACHE_REQUESTS, ERRORS
+from multi_hot import split_labels
+
+RESULT_CACHE_SIZE = int(os.environ.get('CAREER_RESULT_CACHE_SIZE', '4096'))
+RESULT_CACHE_TTL = float(os.environ.get('CAREER_RESULT_CACHE_TTL', '3600'))
+CACHE_URL = os.environ.get('CAREER_CACHE_URL')
+KEY_PREFIX = 'career:recommend'
+
+logger = logging.getLogger(__name__)
+
+
+def profile_key(version, gpa, skills, interests, k=3):
+    """Cache key for one normalized profile under one model version."""
+    return f"{KEY_PREFIX}:{version}:{k}:{float(gpa)!r}:{'|'.join(split_labels(skills))}:{'|'.join(split_labels(interests))}"
+
+
+class RedisBackend:
+    """Shared second-level cache in Redis; needs the optional redis package."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+
+class ResultCache:
+    """Thread-safe LRU with TTL in front of an optional shared backend."""
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _backend_call(self, method, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            ERRORS.inc(endpoint='result_cache', kind=type(e).__name__)
+            logger.warning("Shared result cache %s failed: %s", method, e)
+            return None
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached JSON-serializable value for key, calling compute() on a miss."""
+        value = self._get_local(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(cache='result', result='hit')
+            return value
+        if self.backend is not None:
+            raw = self._backend_call('get', key)
+            if raw is not None:
+                value = json.loads(raw)
+                self._set_local(key, value)
+                CACHE_REQUESTS.inc(cache='result', result='shared_hit')
+                return value
+        CACHE_REQUESTS.inc(cache='result', result='miss')
+        value = compute()
+        self._set_local(key, value)
+        if self.backend is not None:
+            self._backend_call('set', key, json.dumps(value), self.ttl)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def recommend(cache, bundle, gpa, skills, interests, k=3):
+    """Cached ModelBundle.recommend: the top-k (career, probability) pairs for one profile."""
+    skills, interests = split_labels(skills), split_labels(interests)
+    key = profile_key(bundle.version, gpa, skills, interests, k)
+    value = cache.get_or_compute(key, lambda: [
+        [str(career), float(prob)] for career, prob in bundle.recommend(gpa, skills, interests, k)
+    ])
+    return [(career, prob) for career, prob in value]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Returns the process-wide result cache, backed by CAREER_CACHE_URL when set."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(backend=RedisBackend(CACHE_URL) if CACHE_URL else None)
+        return _cache
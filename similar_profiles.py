@@ -0,0 +1,195 @@
+"""
+"Students like you": nearest real profiles from the training data.
+
+The index is built at training time from the encoded profiles and saved with
+the model version as a few memory-mapped .npy files. It holds posting lists
+of row ids, each sorted by GPA:
+
+    pair      one list per (skill, interest) combination seen in the data
+    skill     one list per skill
+    interest  one list per interest
+    all       every row
+
+A query ranks rows by how well they match first and by GPA distance second:
+tier 0 shares a skill and an interest with the query, tier 1 shares either,
+tier 2 is everyone else. Inside a sorted list the k closest GPAs sit within k
+places of the query's insertion point, so each list is answered with one
+searchsorted and a 2k-element window. Lower tiers are only consulted when
+the better ones hold fewer than k rows, so a query costs microseconds
+regardless of how large the dataset is. Profiles with several skills or
+interests (multi-hot models) are indexed under every pair they contain.
+"""
+import os
+import numpy as np
+
+INDEX_DIR = 'profile_index'
+DEFAULT_NEIGHBORS = 5
+TIER_LABELS = ['Same skill and interest', 'Same skill or interest', 'Similar GPA']
+POSTING_KINDS = ['pair', 'skill', 'interest', 'all']
+ROW_ARRAYS = ['gpa', 'career', 'skill_indptr', 'skill_codes', 'interest_indptr', 'interest_codes']
+
+
+def single_labels(codes):
+    """(indptr, codes) for rows that carry exactly one label each."""
+    codes = np.asarray(codes, dtype=np.int32)
+    return np.arange(codes.size + 1, dtype=np.int64), codes
+
+
+def _postings(keys, rows, gpa):
+    """Groups rows by key, each group sorted by GPA, as (keys, starts, rows, gpa) arrays."""
+    order = np.lexsort((rows, gpa[rows], keys))
+    keys, rows = keys[order], rows[order]
+    unique_keys, starts = np.unique(keys, return_index=True)
+    return {
+        'keys': unique_keys.astype(np.int64),
+        'starts': np.append(starts, keys.size).astype(np.int64),
+        'rows': rows.astype(np.int32),
+        'gpa': gpa[rows],
+    }
+
+
+class ProfileIndex:
+    """Training profiles grouped for nearest-neighbor lookups by label match and GPA."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.gpa = arrays['gpa']
+        self.career = arrays['career']
+
+    def __len__(self):
+        return self.gpa.size
+
+    @classmethod
+    def build(cls, gpa, skills, interests, careers):
+        """
+        Builds the index from per-row GPAs, career codes and label sets.
+        skills and interests are (indptr, codes) pairs, as in a CSR matrix.
+        """
+        gpa = np.asarray(gpa, dtype=np.float32)
+        n_rows = gpa.size
+        skill_indptr, skill_codes = (np.asarray(a) for a in skills)
+        interest_indptr, interest_codes = (np.asarray(a) for a in interests)
+        arrays = {
+            'gpa': gpa,
+            'career': np.asarray(careers, dtype=np.int32),
+            'skill_indptr': skill_indptr.astype(np.int64),
+            'skill_codes': skill_codes.astype(np.int32),
+            'interest_indptr': interest_indptr.astype(np.int64),
+            'interest_codes': interest_codes.astype(np.int32),
+        }
+        n_skill_codes = int(skill_codes.max()) + 1 if skill_codes.size else 1
+        skill_counts = np.diff(skill_indptr)
+        interest_counts = np.diff(interest_indptr)
+
+        # Every (skill, interest) combination of a row, without a Python loop over rows.
+        pair_counts = skill_counts * interest_counts
+        pair_rows = np.repeat(np.arange(n_rows), pair_counts)
+        within = np.arange(pair_rows.size) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+        per_row = interest_counts[pair_rows]
+        pair_skills = skill_codes[skill_indptr[pair_rows] + within // np.maximum(per_row, 1)]
+        pair_interests = interest_codes[interest_indptr[pair_rows] + within % np.maximum(per_row, 1)]
+
+        keyed_rows = {
+            'pair': (pair_interests.astype(np.int64) * n_skill_codes + pair_skills, pair_rows),
+            'skill': (skill_codes.astype(np.int64), np.repeat(np.arange(n_rows), skill_counts)),
+            'interest': (interest_codes.astype(np.int64), np.repeat(np.arange(n_rows), interest_counts)),
+            'all': (np.zeros(n_rows, dtype=np.int64), np.arange(n_rows)),
+        }
+        for kind, (keys, rows) in keyed_rows.items():
+            for name, array in _postings(keys, rows, gpa).items():
+                arrays[f'{kind}_{name}'] = array
+        arrays['pair_stride'] = np.array([n_skill_codes], dtype=np.int64)
+        return cls(arrays)
+
+    def save(self, model_dir):
+        index_dir = os.path.join(model_dir, INDEX_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(index_dir, f'{name}.npy'), array)
+
+    @classmethod
+    def load(cls, model_dir):
+        index_dir = os.path.join(model_dir, INDEX_DIR)
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-slice overhead.
+        return cls({
+            name[:-len('.npy')]: np.asarray(np.load(os.path.join(index_dir, name), mmap_mode='r'))
+            for name in os.listdir(index_dir) if name.endswith('.npy')
+        })
+
+    def _posting(self, kind, key):
+        keys = self.arrays[f'{kind}_keys']
+        i = np.searchsorted(keys, key)
+        if i == keys.size or keys[i] != key:
+            return None
+        starts = self.arrays[f'{kind}_starts']
+        return slice(int(starts[i]), int(starts[i + 1]))
+
+    def _nearest(self, kind, key, gpa, k):
+        """Up to k rows of one posting list closest in GPA, as (rows, distances)."""
+        span = self._posting(kind, key)
+        if span is None:
+            return np.empty(0, np.int32), np.empty(0)
+        sorted_gpa = self.arrays[f'{kind}_gpa'][span]
+        pos = int(np.searchsorted(sorted_gpa, gpa))
+        window = slice(max(0, pos - k), min(sorted_gpa.size, pos + k))
+        return self.arrays[f'{kind}_rows'][span][window], np.abs(sorted_gpa[window] - gpa)
+
+    def query(self, gpa, skill_codes, interest_codes, k=DEFAULT_NEIGHBORS):
+        """Returns (rows, tiers, GPA distances) of the k nearest profiles, best first."""
+        gpa = np.float32(gpa)
+        stride = int(self.arrays['pair_stride'][0])
+        tiers = [
+            [('pair', i * stride + s) for s in skill_codes for i in interest_codes if s < stride],
+            [('skill', s) for s in skill_codes] + [('interest', i) for i in interest_codes],
+            [('all', 0)],
+        ]
+        rows, ranks, distances = [], [], []
+        found = 0
+        for tier, lists in enumerate(tiers):
+            for kind, key in lists:
+                tier_rows, tier_distances = self._nearest(kind, key, gpa, k)
+                rows.append(tier_rows)
+                distances.append(tier_distances)
+                ranks.append(np.full(tier_rows.size, tier))
+            found = np.unique(np.concatenate(rows)).size if rows else 0
+            if found >= k:
+                break
+        rows, ranks, distances = np.concatenate(rows), np.concatenate(ranks), np.concatenate(distances)
+        order = np.lexsort((rows, distances, ranks))
+        # A row reached through several lists keeps its best rank.
+        _, first = np.unique(rows[order], return_index=True)
+        best = order[np.sort(first)][:k]
+        return rows[best], ranks[best], distances[best]
+
+    def profile(self, row):
+        """Returns (GPA, skill codes, interest codes, career code) of one indexed row."""
+        a = self.arrays
+        skills = a['skill_codes'][a['skill_indptr'][row]:a['skill_indptr'][row + 1]]
+        interests = a['interest_codes'][a['interest_indptr'][row]:a['interest_indptr'][row + 1]]
+        return float(self.gpa[row]), skills, interests, int(self.career[row])
+
+    def row_arrays(self):
+        """The per-row arrays, for rebuilding the index with more rows."""
+        return {name: np.asarray(self.arrays[name]) for name in ROW_ARRAYS}
+
+
+def load_index(model_dir):
+    """Returns the version's ProfileIndex, or None if it was trained without one."""
+    if not os.path.isdir(os.path.join(model_dir, INDEX_DIR)):
+        return None
+    return ProfileIndex.load(model_dir)
+
+
+def extend_index(index, gpa, skills, interests, careers):
+    """A new index over the rows of index followed by the given rows."""
+    old = index.row_arrays()
+    skill_indptr, skill_codes = skills
+    interest_indptr, interest_codes = interests
+    return ProfileIndex.build(
+        np.concatenate([old['gpa'], np.asarray(gpa, dtype=np.float32)]),
+        (np.concatenate([old['skill_indptr'], old['skill_indptr'][-1] + np.asarray(skill_indptr)[1:]]),
+         np.concatenate([old['skill_codes'], skill_codes])),
+        (np.concatenate([old['interest_indptr'], old['interest_indptr'][-1] + np.asarray(interest_indptr)[1:]]),
+         np.concatenate([old['interest_codes'], interest_codes])),
+        np.concatenate([old['career'], careers]),
+    )
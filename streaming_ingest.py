@@ -0,0 +1,158 @@
+"""
+Streaming ingestion of large training exports.
+
+The CSV or Parquet input is read one chunk at a time. Each chunk is cleaned
+the same way train_model.py cleans the full frame, its categories are added
+to the vocabularies, and its rows are encoded straight into compact on-disk
+arrays: a float32 feature matrix ready for scikit-learn and int8/int16 career
+labels. Rows are split into train and test files as they stream past.
+
+Codes are assigned in first-seen order during the pass, because the full
+vocabulary is only known at the end. A final pass over the compact arrays
+renumbers them to the sorted order LabelEncoder uses. Memory use is bounded
+by the chunk size and the vocabularies, not by the number of rows.
+"""
+import json
+import os
+import numpy as np
+
+FEATURE_COLUMNS = ['GPA', 'Skills', 'Interest']
+TARGET_COLUMN = 'Recommended_Career'
+CATEGORICAL_COLUMNS = ['Skills', 'Interest', TARGET_COLUMN]
+CHUNK_SIZE = 100_000
+MANIFEST_FILE = 'manifest.json'
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yields DataFrames of at most chunk_size rows from a CSV or Parquet file."""
+    import pandas as pd
+    columns = FEATURE_COLUMNS + [TARGET_COLUMN]
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+def _smallest_int(n_values):
+    return np.int8 if n_values <= np.iinfo(np.int8).max + 1 else np.int16
+
+
+class _Vocabulary:
+    """Assigns codes to labels in first-seen order while streaming."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        uniques, inverse = np.unique(values.to_numpy(dtype=object), return_inverse=True)
+        lookup = np.array([self.codes.setdefault(label, len(self.codes)) for label in uniques])
+        return lookup[inverse]
+
+    def sorted_remap(self):
+        """Returns (sorted classes, array mapping first-seen codes to sorted codes)."""
+        labels = np.array(list(self.codes), dtype=object)
+        order = np.argsort(labels)
+        remap = np.empty(len(labels), dtype=np.int64)
+        remap[order] = np.arange(len(labels))
+        return labels[order], remap
+
+
+class StreamedDataset:
+    """Memory-mapped train/test arrays and the fitted encoders from an ingest run."""
+
+    def __init__(self, out_dir):
+        from sklearn.preprocessing import LabelEncoder
+        with open(os.path.join(out_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.manifest = manifest
+        self.encoders = {}
+        for col in CATEGORICAL_COLUMNS:
+            encoder = LabelEncoder()
+            encoder.classes_ = np.array(manifest['vocabularies'][col], dtype=object)
+            self.encoders[col] = encoder
+        label_dtype = np.dtype(manifest['label_dtype'])
+        for split in ('train', 'test'):
+            n_rows = manifest['rows'][split]
+            X = np.memmap(os.path.join(out_dir, f'X_{split}.bin'), dtype=np.float32, mode='r',
+                          shape=(n_rows, len(FEATURE_COLUMNS))) if n_rows else np.empty((0, len(FEATURE_COLUMNS)), np.float32)
+            y = np.memmap(os.path.join(out_dir, f'y_{split}.bin'), dtype=label_dtype, mode='r',
+                          shape=(n_rows,)) if n_rows else np.empty(0, label_dtype)
+            setattr(self, f'X_{split}', X)
+            setattr(self, f'y_{split}', y)
+
+
+def ingest(path, out_dir, chunk_size=CHUNK_SIZE, test_size=0.2, random_state=42, on_chunk=None):
+    """
+    Streams path into compact memory-mapped arrays under out_dir.
+    on_chunk(rows_so_far) is called after each chunk. Returns a StreamedDataset.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vocabularies = {col: _Vocabulary() for col in CATEGORICAL_COLUMNS}
+    rng = np.random.default_rng(random_state)
+    rows = {'train': 0, 'test': 0}
+    files = {
+        name: open(os.path.join(out_dir, f'{name}.tmp'), 'wb')
+        for name in ('X_train', 'X_test', 'y_train', 'y_test')
+    }
+    try:
+        for chunk in iter_chunks(path, chunk_size):
+            chunk = chunk.dropna()
+            for col in CATEGORICAL_COLUMNS:
+                chunk[col] = chunk[col].astype(str).str.strip().str.title()
+            X = np.empty((len(chunk), len(FEATURE_COLUMNS)), dtype=np.float32)
+            X[:, 0] = chunk['GPA'].to_numpy(dtype=np.float32)
+            X[:, 1] = vocabularies['Skills'].encode(chunk['Skills'])
+            X[:, 2] = vocabularies['Interest'].encode(chunk['Interest'])
+            # Labels are widened to int32 on disk until the vocabulary is final.
+            y = vocabularies[TARGET_COLUMN].encode(chunk[TARGET_COLUMN]).astype(np.int32)
+
+            is_test = rng.random(len(chunk)) < test_size
+            for split, mask in (('train', ~is_test), ('test', is_test)):
+                files[f'X_{split}'].write(X[mask].tobytes())
+                files[f'y_{split}'].write(y[mask].tobytes())
+                rows[split] += int(mask.sum())
+            if on_chunk:
+                on_chunk(rows['train'] + rows['test'])
+    finally:
+        for f in files.values():
+            f.close()
+
+    classes, remaps = {}, {}
+    for col in CATEGORICAL_COLUMNS:
+        classes[col], remaps[col] = vocabularies[col].sorted_remap()
+    label_dtype = _smallest_int(len(classes[TARGET_COLUMN]))
+
+    # Renumber to LabelEncoder's sorted codes, one chunk of the compact arrays at a time.
+    for split in ('train', 'test'):
+        n_rows = rows[split]
+        x_path = os.path.join(out_dir, f'X_{split}.tmp')
+        y_tmp = os.path.join(out_dir, f'y_{split}.tmp')
+        y_path = os.path.join(out_dir, f'y_{split}.bin')
+        if n_rows:
+            X = np.memmap(x_path, dtype=np.float32, mode='r+', shape=(n_rows, len(FEATURE_COLUMNS)))
+            y_in = np.memmap(y_tmp, dtype=np.int32, mode='r', shape=(n_rows,))
+            y_out = np.memmap(y_path, dtype=label_dtype, mode='w+', shape=(n_rows,))
+            for start in range(0, n_rows, chunk_size):
+                block = slice(start, start + chunk_size)
+                X[block, 1] = remaps['Skills'][X[block, 1].astype(np.int64)]
+                X[block, 2] = remaps['Interest'][X[block, 2].astype(np.int64)]
+                y_out[block] = remaps[TARGET_COLUMN][y_in[block]]
+            X.flush()
+            y_out.flush()
+            del X, y_in, y_out
+        else:
+            open(y_path, 'wb').close()
+        os.replace(x_path, os.path.join(out_dir, f'X_{split}.bin'))
+        os.remove(y_tmp)
+
+    manifest = {
+        'source': os.path.abspath(path),
+        'rows': rows,
+        'label_dtype': np.dtype(label_dtype).str,
+        'vocabularies': {col: [str(c) for c in classes[col]] for col in CATEGORICAL_COLUMNS},
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    return StreamedDataset(out_dir)
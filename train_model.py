@@ -1,53 +1,563 @@
-import pandas as pd
+import argparse
+import json
+import numpy as np
 import os
-from joblib import dump
+from lattice import build_lattice, verify_lattice
+from forest_artifact import Vocabulary, export_forest, load_forest, probe_profiles, verify_forest
+from forest_compression import MAX_DRIFT, TOP_K, compress_forest, compression_report, pareto_front, rederive, save_report
+from incremental import NEW_TREES, clean_delta, data_watermark, encode_delta, fit_update, load_base, load_watermark, read_delta, save_watermark, widen_forest
+from model_registry import MODEL_DIR, VERSIONS_DIR, activate_version, active_version_dir, new_version_dir
+from model_search import SEARCH_CACHE_DIR, cheapest_within, run_search
+from explanations import as_flat_forest, build_explanations, verify_explanations
+from multi_hot import MultiHotEncoder, load_encoder, probe_matrix
+from similar_profiles import ProfileIndex, extend_index, load_index, single_labels
+from streaming_ingest import CHUNK_SIZE, TARGET_COLUMN, ingest
 
-# Scikit-learn imports
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
+# pandas, scikit-learn, joblib and rich are imported inside the steps that use
+# them, so --help and argument errors answer immediately.
+console = None
 
-# Rich library for beautiful terminal output
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
+def _init_ui():
+    """Imports rich and creates the console on first use."""
+    global console, Panel, Progress, Table
+    if console is not None:
+        return
+    # Rich library for beautiful terminal output
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.progress import Progress
+    from rich.table import Table
+    console = Console()
 
-# Initialize Rich Console
-console = Console()
+DATASET_PATH = os.path.join("dataset", "career_data.csv")
+FEATURES_DIR = os.path.join("model", "features")
+# Share of the training rows held out of a second fit with --compress to choose the compression settings on.
+VALIDATION_SIZE = 0.2
 
-def main():
-    """Main function to orchestrate the model training process."""
-    console.print(Panel.fit("[bold cyan]🚀 Starting AI Model Training and Evaluation 🚀[/bold cyan]", border_style="blue"))
+def cover_all_careers(model, le_career):
+    """
+    Returns the forest with one probability column per career code. A career
+    without fitted rows is missing from model.classes_, which would shift every
+    later column against the codes the lattice and the apps decode, so such a
+    forest is kept as a FlatForest with the missing columns filled with zeros.
+    """
+    missing = len(le_career.classes_) - len(model.classes_)
+    if not missing:
+        return model
+    console.print(f"⚠️ {missing} career(s) have no training rows; they are kept in the model with probability 0.")
+    return widen_forest(model, len(le_career.classes_))
+
+def compile_lattice(model, le_skills, le_interest, model_dir):
+    """Builds the prediction lattice, checks it against the forest and saves it."""
+    lattice = build_lattice(model, len(le_skills.classes_), len(le_interest.classes_))
+    checked, mismatches = verify_lattice(lattice, model)
+    if mismatches:
+        raise ValueError(f"prediction lattice disagrees with the forest on {mismatches} of {checked} profiles")
+    lattice.save(model_dir)
+    console.print(f"✅ Lattice of {lattice.table.size} cells saved; it matches the forest on all {checked} probed profiles.")
+    forest = as_flat_forest(model)
+    if forest is None:
+        return
+    explanations = build_explanations(forest, lattice)
+    checked, mismatches = verify_explanations(explanations, lattice)
+    if mismatches:
+        raise ValueError(f"explanations do not add up to the forest's probabilities in {mismatches} of {checked} cells")
+    explanations.save(model_dir)
+    console.print(f"✅ Per-prediction explanations for all {checked} lattice cells saved.")
+
+def save_artifacts(model, le_skills, le_interest, le_career, step, encoder=None, watermark=None, profiles=None,
+                   compression=None, activate=True):
+    """
+    Saves a new model version with its lattice and flat forest, then activates it.
+    Multi-hot models (encoder given) save the encoder instead of a lattice.
+    The watermark records how far into the training CSV the model has seen, and
+    profiles (GPA, skill and interest label sets, careers) feed the similar-profile index.
+    model may be a compressed FlatForest, saved with its compression report.
+    Returns (version, path).
+    """
+    from joblib import dump
+    console.print(f"\n[yellow]Step {step}: Saving Model and Encoders...[/yellow]")
+    # Each run gets its own version directory; it only goes live once
+    # every artifact is written and model/CURRENT is repointed at it.
+    version, model_dir = new_version_dir(MODEL_DIR)
+
+    # A compressed model exists only as flat arrays; it has no pickle.
+    if hasattr(model, "estimators_"):
+        dump(model, os.path.join(model_dir, "model.pkl"))
+    dump(le_skills, os.path.join(model_dir, "skills_encoder.pkl"))
+    dump(le_interest, os.path.join(model_dir, "interest_encoder.pkl"))
+    dump(le_career, os.path.join(model_dir, "career_encoder.pkl"))
+    console.print(f"✅ Model and encoders successfully saved to the '{model_dir}/' directory.")
+
+    if encoder is not None:
+        console.print(f"\n[yellow]Step {step + 1}: Saving the Multi-Hot Encoder...[/yellow]")
+        encoder.save(model_dir)
+        console.print(f"✅ {encoder.n_features} feature columns saved; a lattice needs one skill and one interest per profile, so none is built.")
+        probes = probe_matrix(encoder)
+    else:
+        console.print(f"\n[yellow]Step {step + 1}: Compiling the Prediction Lattice...[/yellow]")
+        compile_lattice(model, le_skills, le_interest, model_dir)
+        probes = probe_profiles(len(le_skills.classes_), len(le_interest.classes_))
+
+    console.print(f"\n[yellow]Step {step + 2}: Exporting the Flat Forest Artifact...[/yellow]")
+    forest_path = export_forest(model, le_skills, le_interest, le_career, model_dir)
+    if not verify_forest(load_forest(model_dir)[0], model, probes):
+        raise ValueError("flat forest artifact does not reproduce predict_proba exactly")
+    console.print(f"✅ {forest_path} written ({os.path.getsize(forest_path) / 1024:.0f} KB); it reproduces predict_proba exactly.")
+
+    if profiles is not None:
+        index = ProfileIndex.build(*profiles)
+        index.save(model_dir)
+        console.print(f"✅ Similar-profile index over {len(index)} training profiles saved.")
+    if watermark is not None:
+        save_watermark(watermark, model_dir)
+    if compression is not None:
+        save_report(compression, model_dir)
+    if activate:
+        activate_version(version, MODEL_DIR)
+        console.print(f"✅ Model version [bold]{version}[/bold] is now active; running apps will pick it up without a restart.")
+    else:
+        console.print(f"✅ Model version [bold]{version}[/bold] saved.")
+    return version, model_dir
+
+def validation_split(X_train, y_train, in_order=False):
+    """
+    Splits the training rows into rows to fit the selection forest on and
+    validation rows to choose the compression settings on (stratified when
+    every career has enough rows). With in_order the last rows are held out,
+    which slices a memory map without copying it.
+    Returns (X_fit, X_val, y_fit, y_val).
+    """
+    from sklearn.model_selection import train_test_split
+    if in_order:
+        n_fit = X_train.shape[0] - int(X_train.shape[0] * VALIDATION_SIZE)
+        return X_train[:n_fit], X_train[n_fit:], y_train[:n_fit], y_train[n_fit:]
     try:
-        console.print("\n[yellow]Step 1: Loading Dataset...[/yellow]")
-        df = pd.read_csv("dataset/career_data.csv")
-        console.print(f"✅ Dataset loaded successfully with {df.shape[0]} rows and {df.shape[1]} columns.")
+        return train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42, stratify=y_train)
+    except ValueError:
+        # A career with a single training row cannot be stratified.
+        return train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42)
 
-        console.print("\n[yellow]Step 2: Preprocessing Data...[/yellow]")
-        
-        # FINAL FIX: Clean all categorical columns, including the target career
-        for col in ["Skills", "Interest", "Recommended_Career"]:
-            df[col] = df[col].str.strip().str.title()
-        console.print("✅ Data cleaning (trimming whitespace, standardizing case) complete.")
+def compress(model, X_train, y_train, probes, args, step, in_order=False):
+    """
+    Fits a copy of the forest without a share of the training rows, tries smaller
+    versions of it and chooses one on the held-out rows. Reports the size, latency
+    and validation scores of each and returns compress_forest's (reference, candidates, chosen).
+    """
+    from sklearn.base import clone
+    console.print(f"\n[yellow]Step {step}: Choosing Compression Settings...[/yellow]")
+    X_fit, X_val, y_fit, y_val = validation_split(X_train, y_train, in_order)
+    with console.status(f"Fitting a forest without {X_val.shape[0]} validation rows..."):
+        selector = clone(model)
+        # --max-samples may exceed the rows left once the validation rows are out.
+        if isinstance(selector.max_samples, int):
+            selector.set_params(max_samples=min(selector.max_samples, X_fit.shape[0]))
+        selector.fit(X_fit, y_fit)
+    with console.status("Evaluating tree subsets, depth limits" + (" and distilled trees..." if args.distill else "...")):
+        reference, candidates, chosen = compress_forest(
+            as_flat_forest(selector), X_fit, X_val, y_val,
+            tolerance=args.tolerance, max_drift=args.max_drift, distill=args.distill, probes=probes,
+        )
+
+    table = Table(
+        show_header=True, header_style="bold magenta",
+        title=f"Compression Candidates on {X_val.shape[0]} Validation Rows (smallest at each accuracy, and the chosen one)",
+        caption=(
+            "KB: artifact size, ms: one-profile latency, Drift: mean total variation from the full forest's probabilities, "
+            f"Top-{TOP_K}: share of its top {TOP_K} careers the full forest also recommends"
+        ),
+    )
+    shown = pareto_front(candidates)
+    if chosen is not reference and chosen not in shown:
+        shown = sorted(shown + [chosen], key=lambda c: c.size_kb)
+    add_candidate_rows(table, reference, [reference] + shown, "validation", chosen)
+    console.print(table)
+    if chosen is not reference:
+        console.print(
+            f"✅ {len(candidates)} candidates evaluated; the smallest within {args.tolerance:.0%} of the full forest's "
+            f"validation accuracy, with drift at most {args.max_drift:.2f}, is {chosen.kind} "
+            f"({chosen.trees} tree(s), depth {chosen.max_depth or 'unlimited'})."
+        )
+    return reference, candidates, chosen
+
+def add_candidate_rows(table, reference, candidates, split, chosen=None):
+    """Adds one row per candidate with its scores on the given split."""
+    for column in ["Model", "Trees", "Depth", "Nodes", "KB", "ms", "Accuracy", "Change", "Drift", f"Top-{TOP_K}"]:
+        table.add_column(column, justify="left" if column == "Model" else "right")
+    for candidate in candidates:
+        scores = candidate.scores[split]
+        table.add_row(
+            candidate.kind,
+            str(candidate.trees),
+            str(candidate.max_depth or "-"),
+            f"{candidate.n_nodes:,}",
+            f"{candidate.size_kb:,.0f}",
+            f"{candidate.latency_ms:.3f}",
+            f"{scores['accuracy']:.2%}",
+            f"{scores['accuracy'] - reference.scores[split]['accuracy']:+.2%}",
+            f"{scores['drift']:.3f}",
+            f"{scores['top_k_agreement']:.0%}",
+            style="bold green" if candidate is chosen else None,
+        )
+
+def save_compressed(model, X_train, y_train, X_test, y_test, args, step, encoder=None, in_order=False, **artifacts):
+    """
+    Saves the forest fitted on all training rows as an inactive version, chooses
+    compression settings on validation rows held out of a second fit, applies them
+    to the full forest and saves the result as the active version, so either can be
+    selected later with --activate. If no candidate is acceptable, the full forest is served.
+    """
+    if encoder is not None:
+        probes = probe_matrix(encoder)
+    else:
+        probes = probe_profiles(len(artifacts["le_skills"].classes_), len(artifacts["le_interest"].classes_))
+    forest = cover_all_careers(model, artifacts["le_career"])
+    full_version, _ = save_artifacts(forest, step=step, encoder=encoder, activate=False, **artifacts)
+    selection = compress(model, X_train, y_train, probes, args, step + 3, in_order)
+    if selection[2] is selection[0]:
+        console.print(
+            f"✅ No smaller candidate is within {args.tolerance:.0%} of the full forest's validation accuracy with drift "
+            f"at most {args.max_drift:.2f} and top-{TOP_K} careers that agree with it; keeping the full forest."
+        )
+        activate_version(full_version, MODEL_DIR)
+        console.print(f"✅ Model version [bold]{full_version}[/bold] is now active.")
+        return
+
+    with console.status("Applying the chosen settings to the forest fitted on all training rows..."):
+        reference, chosen = rederive(as_flat_forest(forest), selection[2], X_train, X_test, y_test, probes)
+    table = Table(show_header=True, header_style="bold magenta", title="Saved Models on the Test Rows")
+    add_candidate_rows(table, reference, [reference, chosen], "test")
+    console.print(table)
+    console.print(
+        f"✅ The compressed model is {reference.size_kb / chosen.size_kb:,.1f}x smaller and "
+        f"{reference.latency_ms / chosen.latency_ms:.1f}x faster than the full forest."
+    )
+    report = compression_report(selection, reference, chosen, args.tolerance, args.max_drift, parent=full_version)
+    save_artifacts(chosen.forest, step=step + 4, encoder=encoder, compression=report, **artifacts)
+    console.print(f"✅ The full forest stays available as version {full_version}; switch back with --activate {full_version}.")
+
+def activate(args):
+    """Points the apps at an already saved model version, e.g. a full forest instead of its compressed copy."""
+    if not os.path.isdir(os.path.join(MODEL_DIR, VERSIONS_DIR, args.activate)):
+        console.print(f"[bold red]Error: no model version '{args.activate}' in '{os.path.join(MODEL_DIR, VERSIONS_DIR)}/'.[/bold red]")
+        return 1
+    activate_version(args.activate, MODEL_DIR)
+    console.print(f"✅ Model version [bold]{args.activate}[/bold] is now active; running apps will pick it up without a restart.")
+
+def load_dataset(path=DATASET_PATH):
+    """Loads, cleans and label-encodes the dataset (Steps 1 and 2)."""
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+    console.print("\n[yellow]Step 1: Loading Dataset...[/yellow]")
+    df = pd.read_csv(path)
+    console.print(f"✅ Dataset loaded successfully with {df.shape[0]} rows and {df.shape[1]} columns.")
+
+    console.print("\n[yellow]Step 2: Preprocessing Data...[/yellow]")
+    
+    # FINAL FIX: Clean all categorical columns, including the target career
+    for col in ["Skills", "Interest", "Recommended_Career"]:
+        df[col] = df[col].str.strip().str.title()
+    console.print("✅ Data cleaning (trimming whitespace, standardizing case) complete.")
+
+    le_skills = LabelEncoder()
+    le_interest = LabelEncoder()
+    le_career = LabelEncoder()
+
+    df["Skills"] = le_skills.fit_transform(df["Skills"])
+    df["Interest"] = le_interest.fit_transform(df["Interest"])
+    df["Recommended_Career"] = le_career.fit_transform(df["Recommended_Career"])
+    console.print("✅ Categorical features encoded successfully.")
+    return df, le_skills, le_interest, le_career
+
+def load_multi_hot_dataset(path=DATASET_PATH):
+    """
+    Loads the dataset as a sparse multi-hot matrix (Steps 1 and 2).
+    Skills and Interest may list several labels separated by ',', ';' or '|'.
+    """
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+    console.print("\n[yellow]Step 1: Loading Dataset...[/yellow]")
+    df = pd.read_csv(path)
+    console.print(f"✅ Dataset loaded successfully with {df.shape[0]} rows and {df.shape[1]} columns.")
+
+    console.print("\n[yellow]Step 2: Preprocessing Data...[/yellow]")
+    df = df.dropna(subset=["GPA", "Skills", "Interest", "Recommended_Career"])
+    df["Recommended_Career"] = df["Recommended_Career"].str.strip().str.title()
+    encoder = MultiHotEncoder.fit(df["Skills"], df["Interest"])
+    X, _ = encoder.transform(df["GPA"].to_numpy(), df["Skills"], df["Interest"])
+    le_career = LabelEncoder()
+    y = le_career.fit_transform(df["Recommended_Career"])
+    console.print(
+        f"✅ Encoded {len(encoder.skills)} skills and {len(encoder.interests)} interests as a "
+        f"{X.shape[0]} x {X.shape[1]} sparse matrix ({X.nnz} stored values)."
+    )
+    return X, y, encoder, le_career
+
+def search(args):
+    """Cross-validated hyperparameter search that reports quality alongside serving cost."""
+    console.print(Panel.fit("[bold cyan]🔎 Starting Hyperparameter Search 🔎[/bold cyan]", border_style="blue"))
+    try:
+        df, le_skills, le_interest, le_career = load_dataset(args.data)
+        X = df[["GPA", "Skills", "Interest"]].to_numpy()
+        y = df["Recommended_Career"].to_numpy()
+
+        mode = f"random search over {args.n_iter} candidates" if args.n_iter else "grid search"
+        console.print(f"\n[yellow]Step 3: Running {args.folds}-fold stratified {mode}...[/yellow]")
+        with Progress(console=console, transient=True) as progress:
+            task = progress.add_task("Evaluating folds...", total=None)
+            summaries = run_search(
+                X, y,
+                n_folds=args.folds,
+                n_iter=args.n_iter,
+                n_jobs=args.jobs,
+                cache_dir=args.cache_dir,
+                on_result=lambda done, total: progress.update(task, completed=done, total=total),
+            )
+
+        results_table = Table(show_header=True, header_style="bold magenta", title="Cross-Validated Candidates")
+        for column in ["Trees", "Depth", "Leaf", "Features", "Accuracy", "Fit (s)", "Latency (ms)", "Size (KB)"]:
+            results_table.add_column(column, justify="right")
+        for summary in summaries[:args.top]:
+            params = summary["params"]
+            results_table.add_row(
+                str(params["n_estimators"]),
+                str(params["max_depth"]),
+                str(params["min_samples_leaf"]),
+                str(params["max_features"]),
+                f"{summary['accuracy_mean']:.2%} ± {summary['accuracy_std']:.2%}",
+                f"{summary['fit_time_s']:.3f}",
+                f"{summary['predict_latency_ms']:.2f}",
+                f"{summary['model_size_kb']:.0f}",
+            )
+        console.print(results_table)
+
+        best = summaries[0]
+        cheapest = cheapest_within(summaries, args.tolerance)
+        console.print(f"🏆 Most accurate: [bold]{best['params']}[/bold] ({best['accuracy_mean']:.2%})")
+        console.print(
+            f"⚡ Fastest within {args.tolerance:.0%} of it: [bold]{cheapest['params']}[/bold] "
+            f"({cheapest['accuracy_mean']:.2%}, {cheapest['predict_latency_ms']:.2f} ms, {cheapest['model_size_kb']:.0f} KB)"
+        )
+
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        results_path = os.path.join(MODEL_DIR, "search_results.json")
+        with open(results_path, "w") as f:
+            json.dump(summaries, f, indent=2)
+        console.print(f"✅ Full results saved to '{results_path}'.")
+
+    except FileNotFoundError:
+        console.print("[bold red]Error: 'dataset/career_data.csv' not found. Please ensure the dataset is in the correct directory.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
+
+def train_streaming(args):
+    """Trains from chunked, memory-mapped features so peak memory does not grow with the input."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    console.print(Panel.fit("[bold cyan]🚀 Starting Streaming Model Training 🚀[/bold cyan]", border_style="blue"))
+    try:
+        console.print(f"\n[yellow]Step 1: Streaming '{args.data}' into compact arrays...[/yellow]")
+        with Progress(console=console, transient=True) as progress:
+            task = progress.add_task("Encoding chunks...", total=None)
+            data = ingest(
+                args.data,
+                FEATURES_DIR,
+                chunk_size=args.chunk_size,
+                on_chunk=lambda rows: progress.update(task, completed=rows),
+            )
+        rows = data.manifest["rows"]
+        le_skills, le_interest, le_career = (data.encoders[col] for col in ("Skills", "Interest", TARGET_COLUMN))
+        console.print(
+            f"✅ {rows['train'] + rows['test']} rows encoded to '{FEATURES_DIR}/' "
+            f"({len(le_skills.classes_)} skills, {len(le_interest.classes_)} interests, {len(le_career.classes_)} careers)."
+        )
+        console.print(f"✅ Data split: {rows['train']} training samples, {rows['test']} testing samples.")
 
-        le_skills = LabelEncoder()
-        le_interest = LabelEncoder()
-        le_career = LabelEncoder()
+        console.print("\n[yellow]Step 2: Training the Model...[/yellow]")
+        # The memory-mapped float32 matrix is passed to scikit-learn as is, so
+        # the training rows are never copied into process memory.
+        model = RandomForestClassifier(
+            n_estimators=100, random_state=42, n_jobs=args.jobs or -1, max_samples=args.max_samples
+        )
+        model.fit(data.X_train, data.y_train)
+        console.print("✅ Model training complete using RandomForestClassifier.")
+
+        console.print("\n[yellow]Step 3: Evaluating Model Performance...[/yellow]")
+        y_pred = np.empty(rows["test"], dtype=data.y_test.dtype)
+        for start in range(0, rows["test"], args.chunk_size):
+            y_pred[start:start + args.chunk_size] = model.predict(data.X_test[start:start + args.chunk_size])
+        accuracy = accuracy_score(data.y_test, y_pred)
+
+        report_table = Table(show_header=True, header_style="bold magenta", title="Model Performance on Test Data")
+        report_table.add_column("Metric", style="cyan")
+        report_table.add_column("Value", style="green")
+        report_table.add_row("Overall Accuracy", f"{accuracy:.2%}")
+        console.print(report_table)
+
+        report = classification_report(
+            data.y_test, y_pred, labels=range(len(le_career.classes_)), target_names=le_career.classes_, zero_division=0
+        )
+        console.print(Panel(report, title="[bold]Classification Report[/bold]", border_style="cyan", expand=False))
+
+        watermark = None if args.data.endswith((".parquet", ".pq")) else data_watermark(args.data, rows["train"] + rows["test"])
+        # The similar-profile index sorts every row in memory, which would undo the
+        # bounded peak memory of this path, so streamed versions are saved without one.
+        console.print("✅ No similar-profile index in streaming mode; 'students like you' stays off for this version.")
+        artifacts = dict(le_skills=le_skills, le_interest=le_interest, le_career=le_career, watermark=watermark)
+        if args.compress:
+            # The train file keeps the input's row order, so its last rows are held
+            # out for validation; the input should not be sorted by career.
+            save_compressed(
+                model, data.X_train, data.y_train, data.X_test, data.y_test, args, step=4, in_order=True, **artifacts
+            )
+        else:
+            save_artifacts(cover_all_careers(model, le_career), step=4, **artifacts)
 
-        df["Skills"] = le_skills.fit_transform(df["Skills"])
-        df["Interest"] = le_interest.fit_transform(df["Interest"])
-        df["Recommended_Career"] = le_career.fit_transform(df["Recommended_Career"])
-        console.print("✅ Categorical features encoded successfully.")
+        console.print(Panel.fit("[bold green]🎉 Training process completed successfully! 🎉[/bold green]", border_style="green"))
+
+    except FileNotFoundError:
+        console.print(f"[bold red]Error: '{args.data}' not found. Please ensure the dataset is in the correct directory.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
+
+def update(args):
+    """Adds trees fitted only on the rows appended since the active version's watermark."""
+    from sklearn.metrics import accuracy_score
+    console.print(Panel.fit("[bold cyan]🔁 Starting Incremental Model Update 🔁[/bold cyan]", border_style="blue"))
+    try:
+        console.print("\n[yellow]Step 1: Reading Rows Added Since the Current Model...[/yellow]")
+        base_version, base_dir = active_version_dir(MODEL_DIR)
+        if load_encoder(base_dir) is not None:
+            raise ValueError("incremental updates support single-skill models only; retrain the --multi-hot model instead")
+        watermark = load_watermark(base_dir)
+        if watermark is None:
+            raise ValueError("the active model has no data watermark; run a full training once first")
+        if os.path.abspath(args.data) != watermark["source"]:
+            raise ValueError(f"the active model was trained on '{watermark['source']}', not '{args.data}'")
+        delta, end = read_delta(args.data, watermark)
+        delta = clean_delta(delta)
+        if delta.empty:
+            console.print(f"✅ No new rows after row {watermark['rows']}; model version {base_version} is up to date.")
+            return
+        console.print(f"✅ {len(delta)} new rows read (rows {watermark['rows'] + 1}-{watermark['rows'] + len(delta)}).")
+
+        console.print("\n[yellow]Step 2: Scoring the New Rows with the Current Model...[/yellow]")
+        base, le_skills, le_interest, le_career = load_base(base_dir)
+        seen = (
+            delta["Skills"].isin(le_skills.classes_)
+            & delta["Interest"].isin(le_interest.classes_)
+            & delta["Recommended_Career"].isin(le_career.classes_)
+        )
+        if seen.any():
+            X_known, y_known = encode_delta(delta[seen], le_skills, le_interest, le_career)
+            before = accuracy_score(y_known, base.predict(X_known))
+            console.print(f"✅ The current model gets {before:.2%} of the {int(seen.sum())} new rows with known labels right.")
+        else:
+            console.print("✅ Every new row has a label the current model has never seen.")
+
+        console.print(f"\n[yellow]Step 3: Fitting {args.new_trees} Trees on the New Rows...[/yellow]")
+        result = fit_update(base, le_skills, le_interest, le_career, delta, n_trees=args.new_trees)
+        for kind, labels in result.new_labels.items():
+            if labels:
+                console.print(f"✅ New {kind} added to the vocabulary: {', '.join(labels)}")
+        X_delta, y_delta = encode_delta(delta, result.le_skills, result.le_interest, result.le_career)
+        after = accuracy_score(y_delta, result.forest.predict(X_delta))
+        console.print(f"✅ Forest grown from {base.n_estimators} to {result.forest.n_estimators} trees; {after:.2%} of the new rows are now predicted right.")
+
+        console.print("\n[yellow]Step 4: Saving the Updated Version...[/yellow]")
+        version, model_dir = new_version_dir(MODEL_DIR)
+        forest_path = result.save(model_dir)
+        compile_lattice(result.forest, result.le_skills, result.le_interest, model_dir)
+        base_index = load_index(base_dir)
+        if base_index is not None:
+            index = extend_index(base_index, X_delta[:, 0], single_labels(X_delta[:, 1]), single_labels(X_delta[:, 2]), y_delta)
+            index.save(model_dir)
+            console.print(f"✅ Similar-profile index extended to {len(index)} profiles.")
+        save_watermark(
+            data_watermark(args.data, rows=watermark["rows"] + len(delta), offset=end, parent=base_version),
+            model_dir,
+        )
+        activate_version(version, MODEL_DIR)
+        console.print(f"✅ {forest_path} written; version [bold]{version}[/bold] is now active.")
+
+        console.print(Panel.fit("[bold green]🎉 Incremental update completed successfully! 🎉[/bold green]", border_style="green"))
+
+    except FileNotFoundError:
+        console.print(f"[bold red]Error: '{args.data}' not found. Please ensure the dataset is in the correct directory.[/bold red]")
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the career recommendation model.")
+    parser.add_argument("--data", default=DATASET_PATH, help=f"training data, CSV or Parquet (default: {DATASET_PATH})")
+    parser.add_argument("--stream", action="store_true", help="ingest the data in chunks into memory-mapped arrays; implied for Parquet")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"rows per chunk when streaming (default: {CHUNK_SIZE})")
+    parser.add_argument("--max-samples", type=int, default=None, help="cap on bootstrap rows per tree when streaming")
+    parser.add_argument("--search", action="store_true", help="run a cross-validated hyperparameter search instead of training")
+    parser.add_argument("--folds", type=int, default=5, help="number of stratified folds (default: 5)")
+    parser.add_argument("--n-iter", type=int, default=None, help="sample this many candidates instead of the full grid")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for --search, threads for --stream (default: all cores)")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="accuracy loss accepted for a faster or smaller model (default: 0.01)")
+    parser.add_argument("--top", type=int, default=15, help="candidates to show (default: 15)")
+    parser.add_argument("--cache-dir", default=SEARCH_CACHE_DIR, help="where finished folds are cached so a search can resume")
+    parser.add_argument("--update", action="store_true", help="add trees fitted on rows appended since the active model's watermark instead of retraining")
+    parser.add_argument("--new-trees", type=int, default=NEW_TREES, help=f"trees added per --update (default: {NEW_TREES})")
+    parser.add_argument("--multi-hot", action="store_true", help="encode skills and interests as sparse multi-hot sets so profiles can list several")
+    parser.add_argument("--compress", action="store_true", help="also save the smallest tree subset or depth limit within --tolerance of the forest's accuracy, and serve it")
+    parser.add_argument("--max-drift", type=float, default=MAX_DRIFT, help=f"with --compress, largest mean change in probabilities accepted (default: {MAX_DRIFT})")
+    parser.add_argument("--distill", action="store_true", help="with --compress, also try distilling the forest into one shallow tree")
+    parser.add_argument("--activate", metavar="VERSION", help="make a saved model version active instead of training")
+    args = parser.parse_args(argv)
+    args.compress = args.compress or args.distill
+    if args.compress and (args.search or args.update):
+        parser.error("--compress applies to a full training; it cannot be combined with --search or --update")
+    if args.multi_hot and (args.search or args.stream or args.data.endswith((".parquet", ".pq"))):
+        parser.error("--multi-hot trains in memory from a CSV; it cannot be combined with --search or --stream")
+    return args
+
+def main(argv=None):
+    """Main function to orchestrate the model training process."""
+    args = parse_args(argv)
+    _init_ui()
+    if args.activate:
+        return activate(args)
+    if args.search:
+        return search(args)
+    if args.update:
+        return update(args)
+    if args.stream or args.data.endswith((".parquet", ".pq")):
+        return train_streaming(args)
+
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+
+    console.print(Panel.fit("[bold cyan]🚀 Starting AI Model Training and Evaluation 🚀[/bold cyan]", border_style="blue"))
+    try:
+        encoder = None
+        if args.multi_hot:
+            X, y, encoder, le_career = load_multi_hot_dataset(args.data)
+            le_skills, le_interest = Vocabulary(encoder.skills), Vocabulary(encoder.interests)
+            n_skills = len(encoder.skills)
+            skill_columns, interest_columns = X[:, 1:1 + n_skills], X[:, 1 + n_skills:]
+            profiles = (
+                X[:, 0].toarray().ravel(), (skill_columns.indptr, skill_columns.indices),
+                (interest_columns.indptr, interest_columns.indices), y,
+            )
+        else:
+            df, le_skills, le_interest, le_career = load_dataset(args.data)
+            X = df[["GPA", "Skills", "Interest"]]
+            y = df["Recommended_Career"]
+            profiles = (df["GPA"], single_labels(df["Skills"]), single_labels(df["Interest"]), y)
+        watermark = data_watermark(args.data, rows=X.shape[0])
 
         console.print("\n[yellow]Step 3: Splitting Data into Training and Testing Sets...[/yellow]")
-        X = df[["GPA", "Skills", "Interest"]]
-        y = df["Recommended_Career"]
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        console.print(f"✅ Data split: {len(X_train)} training samples, {len(X_test)} testing samples.")
+        console.print(f"✅ Data split: {X_train.shape[0]} training samples, {X_test.shape[0]} testing samples.")
 
         console.print("\n[yellow]Step 4: Training the Model...[/yellow]")
+        # The CSR matrix of a multi-hot run is passed to scikit-learn as is; it is never densified.
         model = RandomForestClassifier(n_estimators=100, random_state=42, oob_score=True)
         model.fit(X_train, y_train)
         console.print("✅ Model training complete using RandomForestClassifier.")
@@ -67,15 +577,11 @@ def main():
         report = classification_report(y_test, y_pred, target_names=le_career.classes_, zero_division=0)
         console.print(Panel(report, title="[bold]Classification Report[/bold]", border_style="cyan", expand=False))
 
-        console.print("\n[yellow]Step 6: Saving Model and Encoders...[/yellow]")
-        model_dir = "model"
-        os.makedirs(model_dir, exist_ok=True)
-
-        dump(model, os.path.join(model_dir, "model.pkl"))
-        dump(le_skills, os.path.join(model_dir, "skills_encoder.pkl"))
-        dump(le_interest, os.path.join(model_dir, "interest_encoder.pkl"))
-        dump(le_career, os.path.join(model_dir, "career_encoder.pkl"))
-        console.print(f"✅ Model and encoders successfully saved to the '{model_dir}/' directory.")
+        artifacts = dict(le_skills=le_skills, le_interest=le_interest, le_career=le_career, watermark=watermark, profiles=profiles)
+        if args.compress:
+            save_compressed(model, X_train, y_train, X_test, y_test, args, step=6, encoder=encoder, **artifacts)
+        else:
+            save_artifacts(cover_all_careers(model, le_career), step=6, encoder=encoder, **artifacts)
         
         console.print(Panel.fit("[bold green]🎉 Training process completed successfully! 🎉[/bold green]", border_style="green"))
 